@@ -0,0 +1,366 @@
+"""
+asyncio runtime for the Lichess bot.
+
+Runs the incoming-event stream, every game stream, all REST calls and the
+Stockfish processes as coroutines on a single event loop. A game costs one
+coroutine instead of a thread plus an engine thread, which keeps many
+concurrent games cheap. Challenge and slot policy, and the handling of each
+game event and move, are shared with LichessBot; this class only supplies
+the awaitable stream, engine and API calls.
+"""
+
+import time
+import signal
+import asyncio
+import logging
+from contextlib import aclosing
+import chess
+import chess.engine
+
+from async_http import AsyncLichessClient, AsyncHttpError
+from engine_pool import AsyncEnginePool
+from game_session import GameSession, final_status
+from streams import AsyncResilientStream, StreamGone, GONE_STATUSES
+from tracing import LineStamps, MoveTrace
+from rate_limit import CHALLENGE
+from log_setup import current_game, THROTTLE
+from roster import Roster, OpponentSample
+from wakeup import AsyncWakeup
+from lichess_bot import (
+    LichessBot,
+    ACCEPT,
+    PLAY,
+    MY_TURN,
+    GAME_OVER,
+    GAME_STREAM_MAX_GAP,
+    EXIT_STARTUP_FAILED,
+    STOCKFISH_PATH,
+    CHALLENGE_MIN_RATING,
+    CHALLENGE_MAX_RATING,
+    CHALLENGE_CLOCK_LIMIT,
+    CHALLENGE_CLOCK_INCREMENT,
+    CHALLENGE_PERF,
+    ROSTER_REFRESH_INTERVAL,
+    ROSTER_SAMPLE_LIMIT,
+    ENGINE_POOL_MIN_SIZE,
+    ENGINE_POOL_MAX_SIZE,
+    PONDER,
+    LICHESS_URL,
+)
+from drain import DRAIN_POLL_INTERVAL
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncLichessBot(LichessBot):
+    def __init__(self, api_token: str):
+        super().__init__(api_token)
+        self.http = AsyncLichessClient(api_token, LICHESS_URL, governor=self.governor)
+        self.async_engine_pool: AsyncEnginePool | None = None
+        self._game_tasks: set[asyncio.Task] = set()
+        self.wakeup = AsyncWakeup()
+
+    def _engine_pool(self):
+        return self.async_engine_pool
+
+    def start(self):
+        return asyncio.run(self._run())
+
+    async def _run(self):
+        try:
+            account = await self.http.request("GET", "/api/account")
+        except Exception as e:
+            logger.error(f"Failed to authenticate: {e}")
+            return EXIT_STARTUP_FAILED
+        if not self._log_in(account):
+            return EXIT_STARTUP_FAILED
+
+        if self.recorder is not None:
+            self.recorder.start(self.username)
+        if not await self._init_async_engine():
+            await self.http.close()
+            return EXIT_STARTUP_FAILED
+        self.book.open()
+        self.tablebase.open()
+
+        loop = asyncio.get_running_loop()
+        try:
+            loop.add_signal_handler(signal.SIGUSR1, self._on_standby_signal, signal.SIGUSR1, None)
+            # Loop signal callbacks run on the loop like any other, so the profiler can start right there
+            loop.add_signal_handler(signal.SIGUSR2, self.profiler.toggle)
+            for signum in (signal.SIGTERM, signal.SIGINT):
+                loop.add_signal_handler(signum, self._on_terminate_signal, signum, None)
+        except (NotImplementedError, RuntimeError):
+            logger.debug("Failed to register signal handlers; signals may not work in this environment")
+
+        if self.shift_profiler is not None:
+            self.shift_profiler.start()
+        roster_refresher = asyncio.create_task(self._roster_loop_async())
+        challenger = asyncio.create_task(self._challenger_loop_async())
+        logger.info("Started bot challenger task")
+
+        logger.info("Starting event stream (async runtime)...")
+        logger.info("Bot is ready! Waiting for challenges and games...")
+
+        # Signal handlers only record a drain request; this task polls it while the event task runs
+        events = asyncio.create_task(self._event_loop_async())
+        try:
+            while not events.done() and not self.drain.requested:
+                await asyncio.wait({events}, timeout=DRAIN_POLL_INTERVAL)
+            if self.drain.requested:
+                await self._drain_games_async()
+        finally:
+            logger.info("Shutting down...")
+            self.challenger_running = False
+            self.running = False
+            for task in (events, roster_refresher, challenger, *self._game_tasks):
+                task.cancel()
+            await asyncio.gather(events, roster_refresher, challenger, *self._game_tasks, return_exceptions=True)
+            await self._cleanup_async()
+        return self.drain.exit_status()
+
+    async def _event_loop_async(self):
+        try:
+            events = AsyncResilientStream(
+                "events",
+                lambda: self.http.stream("/api/stream/event", tee=self._stream_tee("/api/stream/event")),
+                lambda: self.running,
+                self.stream_stats
+            )
+            async for event in events:
+                if event['type'] == 'challenge':
+                    await self._handle_challenge_async(event['challenge'])
+                elif event['type'] == 'gameStart':
+                    await self._start_game_async(event['game'])
+                else:
+                    self._record_event(event)
+        except Exception as e:
+            logger.error("Event stream failed: %s", e)
+
+    async def _start_game_async(self, game: dict):
+        game_id = game.get('id') or game.get('gameId')
+        decision = self._review_game(game_id, game)
+        if decision == PLAY:
+            task = asyncio.create_task(self._play_game_async(game_id))
+            self._game_tasks.add(task)
+            task.add_done_callback(self._game_tasks.discard)
+        elif decision is not None:
+            await self._refuse_game_async(game_id)
+
+    async def _refuse_game_async(self, game_id: str):
+        try:
+            await self.http.request("POST", f"/api/bot/game/{game_id}/abort")
+        except Exception:
+            await self._resign_game_async(game_id)
+
+    async def _resign_game_async(self, game_id: str):
+        try:
+            await self.http.request("POST", f"/api/bot/game/{game_id}/resign")
+        except Exception as e:
+            logger.error("Failed to resign game %s: %s", game_id, e)
+
+    async def _drain_games_async(self):
+        self._begin_drain()
+        while self._draining():
+            await asyncio.sleep(DRAIN_POLL_INTERVAL)
+        if self.is_playing:
+            await self._forfeit_games_async()
+
+    async def _forfeit_games_async(self):
+        game_ids, deadline = self._begin_forfeit()
+        for game_id in game_ids:
+            await self._resign_game_async(game_id)
+        while self.is_playing and time.monotonic() < deadline:
+            await asyncio.sleep(0.1)
+
+    async def _init_async_engine(self) -> bool:
+        logger.info("Initializing Stockfish engine pool (async)...")
+        options = self._engine_options()
+        try:
+            self.async_engine_pool = AsyncEnginePool(
+                STOCKFISH_PATH, options, min_size=ENGINE_POOL_MIN_SIZE, max_size=ENGINE_POOL_MAX_SIZE
+            )
+            await self.async_engine_pool.start()
+            logger.info("Stockfish engine initialized successfully")
+            return True
+        except Exception as e:
+            logger.error(f"Failed to initialize Stockfish: {e}")
+            return False
+
+    async def _handle_challenge_async(self, challenge: dict):
+        challenge_id = challenge['id']
+        decision = self._review_challenge(challenge)
+        if decision is None:
+            return
+        try:
+            if decision == ACCEPT:
+                await self.http.request("POST", f"/api/challenge/{challenge_id}/accept")
+            else:
+                await self.http.request(
+                    "POST", f"/api/challenge/{challenge_id}/decline", json_body={"reason": decision}
+                )
+        except Exception as e:
+            self._answer_failed(challenge_id, decision, e)
+
+    async def _play_game_async(self, game_id: str):
+        # Each game task runs in its own copy of the context
+        current_game.set(game_id)
+        logger.info("Playing game: %s", game_id)
+        session = None
+        engine = None
+
+        try:
+            engine = await self.async_engine_pool.lease(game_id)
+            path = f"/api/bot/game/stream/{game_id}"
+            stamps = LineStamps()
+            events = AsyncResilientStream(
+                f"game {game_id}",
+                lambda: self.http.stream(path, stamps=stamps, tee=self._stream_tee(path)),
+                lambda: self.running,
+                self.stream_stats,
+                max_gap=GAME_STREAM_MAX_GAP,
+                is_final=final_status,
+                gone_statuses=GONE_STATUSES
+            )
+            async for event in events:
+                session, step = self._on_game_event(game_id, event, session,
+                                                    MoveTrace(stamps.received, stamps.decoded))
+                if step == GAME_OVER:
+                    return
+                if step == MY_TURN:
+                    await self._make_move_async(game_id, session, engine)
+
+        except asyncio.CancelledError:
+            raise
+        except StreamGone as e:
+            self._game_gone(game_id, e)
+        except Exception as e:
+            logger.error("Error in game %s: %s", game_id, e)
+        finally:
+            if engine is not None:
+                await self.async_engine_pool.release(engine)
+            self._game_closed(game_id)
+
+    async def _make_move_async(self, game_id: str, session: GameSession, engine: chess.engine.UciProtocol):
+        if not self._move_due(game_id, session):
+            return
+        try:
+            source, move = self._lookup_move(session)
+            if move is None:
+                move = await self._engine_move_async(game_id, session, engine)
+            if self._ready_to_post(session, move):
+                await self._post_move_async(game_id, move)
+                self._record_move(session, source)
+        except Exception as e:
+            logger.error("Failed to make move: %s", e)
+
+    async def _engine_move_async(self, game_id: str, session: GameSession,
+                                 engine: chess.engine.UciProtocol) -> chess.Move | None:
+        bucket, limit = self._start_search(session)
+        result = await engine.play(session.board, limit, game=game_id, ponder=PONDER)
+        return self._finish_search(session, bucket, result)
+
+    async def _post_move_async(self, game_id: str, move: chess.Move):
+        try:
+            await self.http.request("POST", f"/api/bot/game/{game_id}/move/{move.uci()}")
+        except AsyncHttpError as e:
+            if not self._retry_move(game_id, e.status):
+                raise
+            await self.http.request("POST", f"/api/bot/game/{game_id}/move/{move.uci()}")
+
+    async def _fetch_roster_async(self) -> Roster:
+        """Build a roster snapshot while the NDJSON lines arrive, without keeping the decoded bots."""
+        roster = Roster()
+        async for bot in self.http.stream("/api/bot/online"):
+            roster.add(bot)
+        roster.finish()
+        return roster
+
+    async def _roster_loop_async(self):
+        while self.running:
+            try:
+                self.roster.offer(await self._fetch_roster_async())
+            except Exception as e:
+                logger.error("Failed to refresh roster: %s", e, extra=THROTTLE)
+            await asyncio.sleep(ROSTER_REFRESH_INTERVAL)
+
+    async def _pick_opponent_async(self) -> dict | None:
+        roster = self.roster.current()
+        if roster is not None:
+            return self._pick_from_roster(roster)
+        # No roster yet (or it went stale): sample a short list and stop at the first few matches
+        sample = OpponentSample(CHALLENGE_PERF, CHALLENGE_MIN_RATING, CHALLENGE_MAX_RATING,
+                                exclude=self._excluded_ids())
+        try:
+            async with aclosing(self.http.stream("/api/bot/online", {"nb": ROSTER_SAMPLE_LIMIT})) as bots:
+                async for bot in bots:
+                    if sample.offer(bot):
+                        break
+        except Exception as e:
+            logger.error("Failed to fetch online bots: %s", e, extra=THROTTLE)
+            return None
+        return sample.chosen
+
+    async def _challenger_loop_async(self):
+        await asyncio.sleep(5)
+        self._log_challenger_settings()
+        while self.challenger_running:
+            try:
+                await self._run_pipeline_async()
+            except Exception as e:
+                logger.error("Error in challenger loop: %s", e)
+            if self._challenger_stopped():
+                break
+            await self.wakeup.wait(self._challenger_timeout())
+
+    async def _run_pipeline_async(self):
+        to_cancel, to_send = self._pipeline_plan()
+        for challenge_id, expired in to_cancel:
+            await asyncio.sleep(self.governor.ready_in(CHALLENGE))
+            if self._may_cancel(challenge_id, expired):
+                await self.cancel_challenge_async(challenge_id)
+        for _ in range(to_send):
+            await asyncio.sleep(self.governor.ready_in(CHALLENGE))
+            if not self._may_send():
+                return
+            target = await self._pick_opponent_async()
+            if not self._will_challenge(target):
+                return
+            challenge_id = await self.send_challenge_async(
+                target['username'], clock_limit=CHALLENGE_CLOCK_LIMIT,
+                clock_increment=CHALLENGE_CLOCK_INCREMENT
+            )
+            if not challenge_id:
+                return
+            self.scheduler.record_sent(challenge_id, target['username'])
+
+    async def cancel_challenge_async(self, challenge_id: str):
+        try:
+            await self.http.request("POST", f"/api/challenge/{challenge_id}/cancel")
+            logger.info("Canceled challenge %s", challenge_id)
+        except Exception as e:
+            logger.warning("Failed to cancel challenge %s: %s", challenge_id, e)
+
+    async def send_challenge_async(self, username: str, clock_limit: int = 300,
+                                   clock_increment: int = 3, variant: str = 'standard') -> str | None:
+        try:
+            logger.info("Sending casual %s challenge to %s", variant, username)
+            response = await self.http.request("POST", f"/api/challenge/{username}", json_body={
+                "rated": False,
+                "clock.limit": clock_limit,
+                "clock.increment": clock_increment,
+                "variant": variant
+            })
+            logger.info("Challenge sent to %s", username)
+            return self._challenge_id(response)
+        except Exception as e:
+            logger.error("Failed to send challenge: %s", e)
+            return None
+
+    async def _cleanup_async(self):
+        self._stop_capture()
+        if self.async_engine_pool:
+            logger.info("Closing Stockfish engine pool...")
+            await self.async_engine_pool.close()
+        self._close_and_summarize(self.http)
+        await self.http.close()
@@ -0,0 +1,221 @@
+"""
+Minimal asyncio HTTP/1.1 client for the Lichess API.
+
+Used by the async runtime so that the event stream, every game stream and
+all REST calls run as coroutines on one event loop instead of blocking
+threads. Only what the bot needs is implemented: keep-alive connections
+for REST calls, chunked/NDJSON streaming for the event and game streams.
+Requests pass through the same rate governor as the threaded client.
+"""
+
+import json
+import ssl
+import time
+import asyncio
+import logging
+from typing import Any, AsyncIterator, Callable
+from urllib.parse import urlsplit, urlencode
+
+from http_session import timeout_for, STREAM_READ_TIMEOUT
+from rate_limit import RateGovernor, endpoint_class
+from tracing import LineStamps
+
+logger = logging.getLogger(__name__)
+
+API_URL = "https://lichess.org"
+MAX_IDLE_CONNECTIONS = 8
+
+
+class AsyncHttpError(Exception):
+    def __init__(self, status: int, reason: str, body: bytes = b""):
+        super().__init__(f"HTTP {status} {reason}: {body[:200].decode('utf-8', 'replace')}")
+        self.status = status
+        self.body = body
+
+
+class AsyncLichessClient:
+    def __init__(self, api_token: str, base_url: str = API_URL,
+                 max_idle: int = MAX_IDLE_CONNECTIONS, governor: RateGovernor | None = None):
+        url = urlsplit(base_url)
+        self.api_token = api_token
+        self.host = url.hostname or "lichess.org"
+        self.secure = url.scheme == "https"
+        self.port = url.port or (443 if self.secure else 80)
+        self.base_path = url.path.rstrip('/')
+        self.max_idle = max_idle
+        self.governor = governor
+        self._ssl = ssl.create_default_context() if self.secure else None
+        self._idle: list[tuple[asyncio.StreamReader, asyncio.StreamWriter]] = []
+        self.new_connections = 0
+        self.reused_connections = 0
+
+    async def _connect(self) -> tuple[asyncio.StreamReader, asyncio.StreamWriter]:
+        self.new_connections += 1
+        return await asyncio.open_connection(
+            self.host, self.port, ssl=self._ssl, limit=2 ** 20
+        )
+
+    def _encode_request(self, method: str, path: str, body: bytes | None,
+                        content_type: str | None, accept: str) -> bytes:
+        lines = [
+            f"{method} {self.base_path}{path} HTTP/1.1",
+            f"Host: {self.host}",
+            f"Authorization: Bearer {self.api_token}",
+            f"Accept: {accept}",
+            "Connection: keep-alive",
+        ]
+        if body is not None:
+            lines.append(f"Content-Type: {content_type}")
+            lines.append(f"Content-Length: {len(body)}")
+        elif method != "GET":
+            lines.append("Content-Length: 0")
+        head = ("\r\n".join(lines) + "\r\n\r\n").encode('ascii')
+        return head + (body or b"")
+
+    @staticmethod
+    async def _read_head(reader: asyncio.StreamReader) -> tuple[int, str, dict]:
+        status_line = await reader.readline()
+        if not status_line:
+            raise ConnectionResetError("Connection closed before response")
+        _, status, *reason = status_line.decode('latin-1').rstrip('\r\n').split(' ', 2)
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+        return int(status), (reason[0] if reason else ""), headers
+
+    @staticmethod
+    async def _iter_body(reader: asyncio.StreamReader, headers: dict) -> AsyncIterator[bytes]:
+        if headers.get('transfer-encoding', '').lower() == 'chunked':
+            while True:
+                size_line = await reader.readline()
+                if not size_line:
+                    raise ConnectionResetError("Connection closed inside chunked body")
+                size = int(size_line.split(b';', 1)[0].strip(), 16)
+                if size == 0:
+                    # Skip optional trailers up to the terminating blank line
+                    while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+                        pass
+                    return
+                chunk = await reader.readexactly(size)
+                await reader.readexactly(2)
+                yield chunk
+        elif 'content-length' in headers:
+            length = int(headers['content-length'])
+            if length:
+                yield await reader.readexactly(length)
+        else:
+            while chunk := await reader.read(65536):
+                yield chunk
+
+    async def request(self, method: str, path: str, json_body: dict | None = None,
+                      params: dict | None = None, timeout: float | None = None) -> Any:
+        """Perform a REST call on a pooled keep-alive connection and return the decoded JSON."""
+        if params:
+            path = f"{path}?{urlencode({k: v for k, v in params.items() if v is not None})}"
+        body = None
+        if json_body is not None:
+            body = json.dumps({k: v for k, v in json_body.items() if v is not None}).encode('utf-8')
+        payload = self._encode_request(method, path, body, "application/json", "application/json")
+        if timeout is None:
+            timeout = sum(timeout_for(path))
+        if self.governor is not None:
+            # Waiting for the governor does not count against the request timeout
+            await self.governor.acquire_async(endpoint_class(path))
+        return await asyncio.wait_for(self._roundtrip(payload), timeout)
+
+    async def _roundtrip(self, payload: bytes) -> Any:
+        # A pooled connection may have been closed by the server; retry once on a fresh one
+        for attempt in range(2):
+            reused = bool(self._idle)
+            if reused:
+                self.reused_connections += 1
+                reader, writer = self._idle.pop()
+            else:
+                reader, writer = await self._connect()
+            try:
+                writer.write(payload)
+                await writer.drain()
+                status, reason, headers = await self._read_head(reader)
+                data = b"".join([chunk async for chunk in self._iter_body(reader, headers)])
+            except (ConnectionError, asyncio.IncompleteReadError):
+                writer.close()
+                if reused and attempt == 0:
+                    continue
+                raise
+            except BaseException:
+                writer.close()
+                raise
+            if self.governor is not None:
+                self.governor.record_response(status, headers)
+            if headers.get('connection', '').lower() == 'close' or len(self._idle) >= self.max_idle:
+                writer.close()
+            else:
+                self._idle.append((reader, writer))
+            if status >= 400:
+                raise AsyncHttpError(status, reason, data)
+            if data and 'json' in headers.get('content-type', ''):
+                return json.loads(data)
+            return None
+
+    async def stream(self, path: str, params: dict | None = None, stamps: LineStamps | None = None,
+                     tee: Callable[[bytes], None] | None = None) -> AsyncIterator[dict]:
+        """
+        Open a dedicated connection to an NDJSON endpoint and yield one dict per line.
+        If stamps is given, it records when each yielded line arrived and was decoded;
+        tee is called with every raw line before it is decoded.
+        """
+        if params:
+            path = f"{path}?{urlencode({k: v for k, v in params.items() if v is not None})}"
+        if self.governor is not None:
+            await self.governor.acquire_async(endpoint_class(path))
+        reader, writer = await self._connect()
+        try:
+            writer.write(self._encode_request("GET", path, None, None, "application/x-ndjson"))
+            await writer.drain()
+            status, reason, headers = await self._read_head(reader)
+            if self.governor is not None:
+                self.governor.record_response(status, headers)
+            if status >= 400:
+                data = b"".join([chunk async for chunk in self._iter_body(reader, headers)])
+                raise AsyncHttpError(status, reason, data)
+            buffer = b""
+            chunks = self._iter_body(reader, headers)
+            while True:
+                try:
+                    chunk = await asyncio.wait_for(chunks.__anext__(), STREAM_READ_TIMEOUT)
+                except StopAsyncIteration:
+                    break
+                arrived = time.monotonic()
+                buffer += chunk
+                *lines, buffer = buffer.split(b"\n")
+                for line in lines:
+                    # Lichess sends empty lines as keep-alives
+                    if line.strip():
+                        if tee is not None:
+                            tee(line)
+                        event = json.loads(line)
+                        if stamps is not None:
+                            stamps.received, stamps.decoded = arrived, time.monotonic()
+                        yield event
+            if buffer.strip():
+                if tee is not None:
+                    tee(buffer)
+                event = json.loads(buffer)
+                if stamps is not None:
+                    stamps.received, stamps.decoded = arrived, time.monotonic()
+                yield event
+        finally:
+            writer.close()
+
+    def log_summary(self):
+        logger.info(f"HTTP: {self.new_connections} new connection(s), "
+                    f"{self.reused_connections} request(s) on reused connections")
+
+    async def close(self):
+        while self._idle:
+            _, writer = self._idle.pop()
+            writer.close()
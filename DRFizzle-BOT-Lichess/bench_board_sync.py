@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Microbenchmark: cost of bringing the board up to date per gameState event.
+
+Compares the old approach (replay every move from the initial position on
+each event) with GameSession.sync (push only the new moves). The old cost
+grows linearly with the ply count, the incremental cost stays flat.
+
+Usage: python DRFizzle-BOT-Lichess/bench_board_sync.py [max_ply]
+"""
+
+import sys
+import random
+import timeit
+import chess
+
+from game_session import GameSession
+
+REPEAT = 200
+
+
+def random_game(plies: int, seed: int = 1) -> list[str]:
+    """Play random legal moves until the game reaches the requested length."""
+    while True:
+        rng = random.Random(seed)
+        board = chess.Board()
+        moves = []
+        while len(moves) < plies and not board.is_game_over():
+            move = rng.choice(list(board.legal_moves))
+            board.push(move)
+            moves.append(move.uci())
+        if len(moves) == plies:
+            return moves
+        seed += 1
+
+
+def replay(moves_text: str) -> chess.Board:
+    board = chess.Board(chess.STARTING_FEN)
+    for move in moves_text.split():
+        board.push_uci(move)
+    return board
+
+
+def main():
+    max_ply = int(sys.argv[1]) if len(sys.argv) > 1 else 240
+    moves = random_game(max_ply)
+    print(f"{'ply':>5} {'replay (us)':>12} {'incremental (us)':>17}")
+    for ply in (10, 50, 100, 150, 200, max_ply):
+        if ply > max_ply:
+            continue
+        before = " ".join(moves[:ply - 1])
+        after = " ".join(moves[:ply])
+
+        replay_s = timeit.timeit(lambda: replay(after), number=REPEAT) / REPEAT
+
+        # Time one sync of a single new move onto a session already at ply - 1
+        sessions = []
+        for _ in range(REPEAT):
+            session = GameSession("bench")
+            session.sync(before)
+            sessions.append(session)
+        it = iter(sessions)
+        incremental_s = timeit.timeit(lambda: next(it).sync(after), number=REPEAT) / REPEAT
+
+        print(f"{ply:>5} {replay_s * 1e6:>12.1f} {incremental_s * 1e6:>17.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,252 @@
+#!/usr/bin/env python3
+"""
+Engine benchmark: throughput and latency across search limits, threads, hash and pool size.
+
+Runs the configured engine (STOCKFISH_PATH, with the bot's skill level)
+over a position suite for every combination of a search limit (depth,
+nodes or movetime), Threads, Hash and pool size. A pool of N processes is
+driven by N workers at once, each searching position after position, as
+when N games all wait on the engine together; that is the worst case for a
+runner. Per configuration it reports moves per second across the pool,
+latency p50/p95/p99 per search, nodes per search and RSS per process.
+
+The suite is a set of built-in positions from every game phase, plus
+positions sampled from our own games: a stream capture (RECORD_DIR) or a
+PGN export. The recommendation is the configuration that fits the most
+concurrent games on this host. Its p99 must stay within the latency SLO,
+the pool must fit in the memory budget, and Threads times the pool size
+may not exceed the CPU count. Ties go to the configuration that searches
+the most nodes per move, i.e. the strongest play at that capacity.
+
+Usage: python DRFizzle-BOT-Lichess/bench_engine.py [--capture dir] [--pgn file] [--slo-ms 300] [--help for all options]
+"""
+
+import os
+import json
+import time
+import random
+import argparse
+import itertools
+import threading
+import chess
+import chess.pgn
+import chess.engine
+
+from engine_pool import EnginePool
+from lichess_bot import STOCKFISH_PATH, STOCKFISH_DEPTH, STOCKFISH_THREADS, STOCKFISH_HASH, STOCKFISH_SKILL_LEVEL
+from recording import read_capture
+from tracing import percentile
+
+# Opening, middlegame and endgame positions for the built-in part of the suite
+SUITE_FENS = (
+    chess.STARTING_FEN,
+    "r1bqkbnr/pppp1ppp/2n5/4p3/4P3/5N2/PPPP1PPP/RNBQKB1R w KQkq - 2 3",
+    "rnbqkb1r/pp2pppp/3p1n2/8/3NP3/8/PPP2PPP/RNBQKB1R w KQkq - 1 5",
+    "r1bq1rk1/pp2bppp/2n1pn2/2pp4/3P4/2PBPN2/PP1N1PPP/R1BQ1RK1 w - - 0 8",
+    "r2q1rk1/1b1nbppp/p2ppn2/1p6/3NP3/1BN1BP2/PPPQ2PP/2KR3R w - - 2 12",
+    "2rq1rk1/pp1bppbp/3p1np1/8/2BNP3/2N1BP2/PPPQ2PP/2KR3R b - - 6 13",
+    "r4rk1/1pp1qppp/p1np1n2/2b1p1B1/2B1P1b1/P1NP1N2/1PP1QPPP/R4RK1 w - - 0 10",
+    "4r1k1/p1p2ppp/1p1p4/3P4/2P1r3/1P3P2/P5PP/3RR1K1 w - - 0 24",
+    "8/5pk1/6p1/2R5/r6P/6P1/5PK1/8 w - - 0 45",
+    "8/8/4k3/3p4/3K4/4P3/8/8 w - - 0 60",
+)
+SAMPLE_EVERY = 6  # Plies between positions sampled from our own games
+MAX_SAMPLED = 60  # Positions sampled from our own games at most
+DEFAULT_SLO_MS = 300.0  # p99 per search; a 1+0 game leaves little more than this per move
+
+
+def positions_from_capture(directory: str) -> list[chess.Board]:
+    """Sample positions from the game streams of a capture (RECORD_DIR/<start time>)."""
+    boards = []
+    for name in sorted(os.listdir(directory)):
+        if not (name.startswith("game-") and name.endswith(".ndjson")):
+            continue
+        moves = ""
+        for _, line in read_capture(os.path.join(directory, name)):
+            event = json.loads(line)
+            state = event.get('state', event)
+            moves = state.get('moves', moves) or moves
+        boards.extend(_sample(moves.split()))
+    return boards
+
+
+def positions_from_pgn(path: str) -> list[chess.Board]:
+    boards = []
+    with open(path, encoding='utf-8') as f:
+        while (game := chess.pgn.read_game(f)) is not None:
+            if game.headers.get('Variant', 'Standard') != 'Standard':
+                continue
+            boards.extend(_sample([move.uci() for move in game.mainline_moves()]))
+    return boards
+
+
+def _sample(moves: list[str]) -> list[chess.Board]:
+    board = chess.Board()
+    boards = []
+    for ply, uci in enumerate(moves, 1):
+        board.push_uci(uci)
+        if ply % SAMPLE_EVERY == 0 and not board.is_game_over():
+            boards.append(board.copy())
+    return boards
+
+
+def build_suite(args: argparse.Namespace) -> list[chess.Board]:
+    suite = [chess.Board(fen) for fen in SUITE_FENS]
+    own = []
+    if args.capture:
+        own += positions_from_capture(args.capture)
+    if args.pgn:
+        own += positions_from_pgn(args.pgn)
+    if len(own) > MAX_SAMPLED:
+        own = random.Random(args.seed).sample(own, MAX_SAMPLED)
+    return suite + own
+
+
+def engine_rss(engine: chess.engine.SimpleEngine) -> int:
+    try:
+        pid = engine.protocol.transport.get_pid()
+        with open(f"/proc/{pid}/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (AttributeError, OSError, IndexError, ValueError):
+        return 0
+
+
+def run_config(path: str, limit: chess.engine.Limit, threads: int, hash_mb: int, pool_size: int,
+               suite: list[chess.Board], rounds: int) -> dict:
+    pool = EnginePool(path, {"Threads": threads, "Hash": hash_mb, "Skill Level": STOCKFISH_SKILL_LEVEL},
+                      min_size=pool_size, max_size=pool_size)
+    pool.start()
+    latencies: list[float] = []
+    nodes: list[int] = []
+    rss: list[int] = []
+    lock = threading.Lock()
+
+    def worker(index: int):
+        engine = pool.lease(f"bench-{index}")
+        own_latencies, own_nodes = [], []
+        try:
+            # Every worker walks the suite from a different offset so the pool is not in lockstep
+            order = suite[index % len(suite):] + suite[:index % len(suite)]
+            for board in order * rounds:
+                started = time.perf_counter()
+                result = engine.play(board, limit, info=chess.engine.INFO_BASIC, game=index)
+                own_latencies.append(time.perf_counter() - started)
+                own_nodes.append(result.info.get('nodes', 0))
+            memory = engine_rss(engine)
+        finally:
+            pool.release(engine)
+        with lock:
+            latencies.extend(own_latencies)
+            nodes.extend(own_nodes)
+            rss.append(memory)
+
+    workers = [threading.Thread(target=worker, args=(i,)) for i in range(pool_size)]
+    started = time.perf_counter()
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    pool.close()
+
+    latencies.sort()
+    return {
+        "limit": {key: value for key, value in (("depth", limit.depth), ("nodes", limit.nodes),
+                                                ("movetime_ms", limit.time and round(limit.time * 1000))) if value is not None},
+        "threads": threads,
+        "hash_mb": hash_mb,
+        "pool_size": pool_size,
+        "searches": len(latencies),
+        "moves_per_second": round(len(latencies) / elapsed, 1),
+        "latency_ms": {f"p{p}": round(percentile(latencies, p) * 1000, 1) for p in (50, 95, 99)},
+        "nodes_per_search": round(sum(nodes) / len(nodes)) if nodes else 0,
+        "rss_mb_per_process": round(max(rss, default=0) / 2**20, 1),
+    }
+
+
+def available_memory() -> int:
+    try:
+        with open("/proc/meminfo") as f:
+            for line in f:
+                if line.startswith("MemAvailable:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return os.sysconf('SC_PAGE_SIZE') * os.sysconf('SC_PHYS_PAGES')
+
+
+def recommend(results: list[dict], slo_ms: float, memory_budget: int, cpus: int) -> dict | None:
+    """Most concurrent games within the SLO, memory and CPU; ties go to more nodes per search."""
+    fitting = [
+        result for result in results
+        if result["latency_ms"]["p99"] <= slo_ms
+        and result["rss_mb_per_process"] * 2**20 * result["pool_size"] <= memory_budget
+        and result["threads"] * result["pool_size"] <= cpus
+    ]
+    return max(fitting, key=lambda r: (r["pool_size"], r["nodes_per_search"], r["moves_per_second"]), default=None)
+
+
+def _int_list(text: str) -> list[int]:
+    return [int(value) for value in text.split(",") if value]
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    cpus = os.cpu_count() or 1
+    parser = argparse.ArgumentParser(description="Engine configuration sweep")
+    parser.add_argument("--engine", default=STOCKFISH_PATH, help="engine binary (default: STOCKFISH_PATH)")
+    parser.add_argument("--capture", help="stream capture directory to sample positions from")
+    parser.add_argument("--pgn", help="PGN export of our games to sample positions from")
+    parser.add_argument("--depth", default=f"{STOCKFISH_DEPTH},4,8", help="depth limits to try")
+    parser.add_argument("--nodes", default="1000,10000", help="node limits to try")
+    parser.add_argument("--movetime", default="50,100", help="movetime limits to try, in ms")
+    parser.add_argument("--threads", default=",".join(str(t) for t in sorted({STOCKFISH_THREADS, 2})))
+    parser.add_argument("--hash", default=",".join(str(h) for h in sorted({STOCKFISH_HASH, 16, 64})), help="MB")
+    parser.add_argument("--pool", default=",".join(str(p) for p in sorted({1, 2, cpus, 2 * cpus})),
+                        help="pool sizes (concurrent engines) to try")
+    parser.add_argument("--rounds", type=int, default=1, help="passes over the suite per worker")
+    parser.add_argument("--slo-ms", type=float, default=DEFAULT_SLO_MS, help="p99 latency per search")
+    parser.add_argument("--memory-mb", type=int, help="memory budget for the pool (default: available memory)")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="also write all results as JSON to this path")
+    return parser.parse_args(argv)
+
+
+def main(argv: list[str] | None = None):
+    args = parse_args(argv)
+    suite = build_suite(args)
+    limits = ([chess.engine.Limit(depth=d) for d in _int_list(args.depth)]
+              + [chess.engine.Limit(nodes=n) for n in _int_list(args.nodes)]
+              + [chess.engine.Limit(time=ms / 1000) for ms in _int_list(args.movetime)])
+    grid = list(itertools.product(limits, _int_list(args.threads), _int_list(args.hash), _int_list(args.pool)))
+    cpus = os.cpu_count() or 1
+    memory_budget = args.memory_mb * 2**20 if args.memory_mb else available_memory()
+    print(f"{len(suite)} positions ({len(suite) - len(SUITE_FENS)} from our games), {len(grid)} configurations, "
+          f"{cpus} CPU(s), memory budget {memory_budget / 2**20:.0f} MB")
+    print(f"{'limit':<16} {'thr':>3} {'hash':>5} {'pool':>4} {'moves/s':>8} {'p50 ms':>7} {'p95 ms':>7} "
+          f"{'p99 ms':>7} {'nodes':>8} {'rss MB':>7}")
+    results = []
+    for limit, threads, hash_mb, pool_size in grid:
+        result = run_config(args.engine, limit, threads, hash_mb, pool_size, suite, args.rounds)
+        results.append(result)
+        latency = result["latency_ms"]
+        limit_text = " ".join(f"{key} {value:g}" for key, value in result["limit"].items())
+        print(f"{limit_text:<16} {threads:>3} {hash_mb:>5} {pool_size:>4} {result['moves_per_second']:>8} "
+              f"{latency['p50']:>7} {latency['p95']:>7} {latency['p99']:>7} {result['nodes_per_search']:>8} "
+              f"{result['rss_mb_per_process']:>7}", flush=True)
+    best = recommend(results, args.slo_ms, memory_budget, cpus)
+    if best is None:
+        print(f"No configuration keeps p99 within {args.slo_ms:g} ms on this host")
+    else:
+        limit_text = ", ".join(f"{key} {value:g}" for key, value in best["limit"].items())
+        print(f"Recommended within p99 {args.slo_ms:g} ms: {limit_text}, Threads {best['threads']}, "
+              f"Hash {best['hash_mb']} MB, pool size {best['pool_size']} "
+              f"(one engine per game slot, p99 {best['latency_ms']['p99']} ms, "
+              f"{best['nodes_per_search']} nodes per move)")
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"slo_ms": args.slo_ms, "cpus": cpus, "memory_budget_mb": round(memory_budget / 2**20),
+                       "positions": len(suite), "results": results, "recommended": best}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,245 @@
+#!/usr/bin/env python3
+"""
+End-to-end load benchmark: the real bot against the local stand-in server.
+
+For each concurrency level (MAX_CONCURRENT_GAMES) a fresh local_lichess.py
+server with scripted opponents and a fresh bot process are started, and the
+bot plays 1+0 games for a fixed time. The bot is then stopped and the run is
+scored. Games per hour and the flag rate come from the server's counts.
+Event-to-move p50/p99 comes from the bot's per-move trace log lines. CPU
+per game is the bot's CPU time, including its engine processes, divided by
+the games finished. Peak RSS covers the bot process and the bot plus its
+engines together. The flag rate climbing or p99 nearing the move overhead
+marks the concurrency one runner can no longer sustain.
+
+Usage: python DRFizzle-BOT-Lichess/bench_load.py [--max-concurrency 8] [--duration 120] [--help for all options]
+Writes a JSON report (bench_load.json by default) and prints a summary table.
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import socket
+import signal
+import argparse
+import platform
+import tempfile
+import threading
+import subprocess
+import urllib.request
+
+from tracing import percentile
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+MOVE_TRACE = re.compile(r"Move trace \S+ ply \d+ \((\w+)\): .*total ([\d.]+) ms")
+SERVER_START_TIMEOUT = 10  # Seconds to wait for the stand-in server to listen
+BOT_STOP_TIMEOUT = 60  # Seconds the bot gets to shut down before it is killed
+RSS_POLL_INTERVAL = 1.0  # Seconds between RSS samples of the bot and its engines
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def fetch_json(url: str) -> dict:
+    with urllib.request.urlopen(url, timeout=5) as response:
+        return json.load(response)
+
+
+def wait_for_server(url: str):
+    deadline = time.monotonic() + SERVER_START_TIMEOUT
+    while True:
+        try:
+            return fetch_json(url)
+        except OSError:
+            if time.monotonic() > deadline:
+                raise
+            time.sleep(0.1)
+
+
+def rss_bytes(pid: int) -> int:
+    try:
+        with open(f"/proc/{pid}/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, IndexError, ValueError):
+        return 0
+
+
+def child_pids(pid: int) -> list[int]:
+    children = []
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                # ppid is the 2nd field after the parenthesised command name
+                if int(f.read().rsplit(")", 1)[1].split()[1]) == pid:
+                    children.append(int(entry))
+        except (OSError, IndexError, ValueError):
+            continue
+    return children
+
+
+class RssSampler:
+    """Peak RSS of a process and of the process plus its direct children (the engines)."""
+
+    def __init__(self, pid: int):
+        self.pid = pid
+        self.peak_process = 0
+        self.peak_total = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while not self._stop.wait(RSS_POLL_INTERVAL):
+            own = rss_bytes(self.pid)
+            self.peak_process = max(self.peak_process, own)
+            self.peak_total = max(self.peak_total, own + sum(rss_bytes(pid) for pid in child_pids(self.pid)))
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+
+def wait_with_usage(process: subprocess.Popen, timeout: float):
+    """Reap process with wait4, killing it after timeout; the usage covers the engines it reaped too."""
+    deadline = time.monotonic() + timeout
+    while True:
+        pid, status, usage = os.wait4(process.pid, os.WNOHANG)
+        if pid:
+            process.returncode = os.waitstatus_to_exitcode(status)
+            return usage
+        if time.monotonic() > deadline:
+            process.kill()
+            deadline = float('inf')
+        time.sleep(0.1)
+
+
+def run_level(concurrency: int, args: argparse.Namespace, workdir: str) -> dict:
+    server_port = free_port()
+    server_url = f"http://127.0.0.1:{server_port}"
+    opponents = max(args.opponents, 4 * concurrency)
+    server_cmd = [
+        sys.executable, os.path.join(HERE, "local_lichess.py"), "--port", str(server_port),
+        "--opponents", str(opponents), "--think", str(args.think), "--answer-latency", str(args.answer_latency),
+        "--latency", str(args.latency), "--rate429", str(args.rate429), "--seed", str(args.seed),
+    ]
+    env = dict(os.environ, LICHESS_URL=server_url, LICHESS_API_TOKEN="bench", MAX_CONCURRENT_GAMES=str(concurrency),
+               BOT_RUNTIME=args.runtime, METRICS_PORT="0", LOG_JSON="0",
+               # The run is scored before the stop; resign what is left right away instead of draining
+               DRAIN_DEADLINE="0")
+    if args.engine:
+        env["STOCKFISH_PATH"] = args.engine
+    bot_log_path = os.path.join(workdir, f"bot-{concurrency}.log")
+    with open(os.path.join(workdir, f"server-{concurrency}.log"), "w") as server_log, \
+            open(bot_log_path, "w") as bot_log:
+        server = subprocess.Popen(server_cmd, stdout=server_log, stderr=subprocess.STDOUT)
+        try:
+            wait_for_server(f"{server_url}/standin/stats")
+            started = time.monotonic()
+            bot = subprocess.Popen([sys.executable, os.path.join(HERE, "lichess_bot.py")], env=env,
+                                   stdout=bot_log, stderr=subprocess.STDOUT, cwd=workdir)
+            sampler = RssSampler(bot.pid)
+            time.sleep(args.duration)
+            stats = fetch_json(f"{server_url}/standin/stats")
+            elapsed = time.monotonic() - started
+            bot.send_signal(signal.SIGTERM)
+            usage = wait_with_usage(bot, BOT_STOP_TIMEOUT)
+            sampler.stop()
+        finally:
+            server.terminate()
+            server.wait()
+
+    samples: dict[str, list[float]] = {}
+    with open(bot_log_path, encoding="utf-8", errors="replace") as f:
+        for line in f:
+            match = MOVE_TRACE.search(line)
+            if match:
+                samples.setdefault(match.group(1), []).append(float(match.group(2)))
+    all_moves = sorted(ms for values in samples.values() for ms in values)
+    finished = {key: count for key, count in stats["games_finished"].items() if key != "aborted"}
+    games = sum(finished.values())
+    cpu = usage.ru_utime + usage.ru_stime
+    return {
+        "concurrency": concurrency,
+        "seconds": round(elapsed, 1),
+        "games_finished": games,
+        "games_by_status": stats["games_finished"],
+        "games_per_hour": round(games / elapsed * 3600, 1),
+        "bot_flags": stats["bot_flags"],
+        "flag_rate": round(stats["bot_flags"] / games, 4) if games else None,
+        "moves": len(all_moves),
+        "event_to_move_ms": {
+            "p50": round(percentile(all_moves, 50), 2) if all_moves else None,
+            "p99": round(percentile(all_moves, 99), 2) if all_moves else None,
+        },
+        "event_to_move_ms_by_source": {
+            source: {"moves": len(values), "p50": round(percentile(sorted(values), 50), 2),
+                     "p99": round(percentile(sorted(values), 99), 2)}
+            for source, values in samples.items()
+        },
+        "cpu_seconds": round(cpu, 2),
+        "cpu_seconds_per_game": round(cpu / games, 3) if games else None,
+        # ru_maxrss is in KiB on Linux
+        "peak_rss_mb": round(max(usage.ru_maxrss * 1024, sampler.peak_process) / 2**20, 1),
+        "peak_rss_with_engines_mb": round(sampler.peak_total / 2**20, 1),
+        "rate_limited": stats["rate_limited"],
+    }
+
+
+def _cell(value) -> str:
+    return "-" if value is None else str(value)
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="End-to-end load benchmark against local_lichess.py")
+    parser.add_argument("--max-concurrency", type=int, default=8, help="sweep concurrency 1..N")
+    parser.add_argument("--levels", help="comma-separated concurrency levels instead of 1..N")
+    parser.add_argument("--duration", type=float, default=120, help="seconds of play per level")
+    parser.add_argument("--runtime", default=os.environ.get("BOT_RUNTIME", "threads"), choices=("threads", "async"))
+    parser.add_argument("--engine", help="engine binary (STOCKFISH_PATH); defaults to the bot's setting")
+    parser.add_argument("--opponents", type=int, default=20, help="scripted opponents (at least 4 per slot)")
+    parser.add_argument("--think", type=float, default=0.3, help="average opponent seconds per move")
+    parser.add_argument("--answer-latency", type=float, default=0.5, help="average seconds to answer a challenge")
+    parser.add_argument("--latency", type=float, default=0.0, help="server latency per response in seconds")
+    parser.add_argument("--rate429", type=float, default=0.0, help="share of REST calls answered with 429")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", default="bench_load.json", help="JSON report path")
+    return parser.parse_args(argv)
+
+
+def main(argv: list[str] | None = None):
+    args = parse_args(argv)
+    levels = ([int(level) for level in args.levels.split(",")] if args.levels
+              else list(range(1, args.max_concurrency + 1)))
+    report = {
+        "benchmark": "load",
+        "started": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "host": {"platform": platform.platform(), "cpus": os.cpu_count(), "python": platform.python_version()},
+        "settings": {key: value for key, value in vars(args).items() if key not in ("output", "levels")},
+        "levels": [],
+    }
+    print(f"{'conc':>4} {'games':>6} {'games/h':>8} {'flags':>6} {'p50 ms':>8} {'p99 ms':>8} "
+          f"{'cpu/game s':>10} {'rss MB':>7} {'+eng MB':>8}")
+    with tempfile.TemporaryDirectory(prefix="bench_load-") as workdir:
+        for concurrency in levels:
+            result = run_level(concurrency, args, workdir)
+            report["levels"].append(result)
+            latency = result["event_to_move_ms"]
+            flag_rate = result["flag_rate"]
+            print(f"{concurrency:>4} {result['games_finished']:>6} {result['games_per_hour']:>8.0f} "
+                  f"{_cell(None if flag_rate is None else f'{flag_rate:.1%}'):>6} {_cell(latency['p50']):>8} {_cell(latency['p99']):>8} "
+                  f"{_cell(result['cpu_seconds_per_game']):>10} {result['peak_rss_mb']:>7} "
+                  f"{result['peak_rss_with_engines_mb']:>8}", flush=True)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"Report written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Microbenchmark: logging cost per move, as seen by the game thread.
+
+Each simulated move logs what the bot logs on the move path ("Playing move"
+and the move trace record). The old setup (f-strings through a synchronous
+stderr handler) is compared with the queue-backed handler, in text and in
+JSON lines, against a fast sink and a slow one that blocks on every write
+(like a full pipe or a busy terminal). Reports mean and p99 per move in
+microseconds.
+
+Usage: python DRFizzle-BOT-Lichess/bench_logging.py [slow sink delay in microseconds]
+"""
+
+import io
+import sys
+import time
+import logging
+import chess
+
+import log_setup
+from tracing import _Spans, percentile
+
+MOVES = 2000
+SLOW_SINK_DELAY_US = 200
+SPANS = {'decode': 0.00004, 'sync': 0.0002, 'select': 0.0003, 'search': 0.0015, 'post': 0.0008, 'total': 0.0028}
+
+
+class Sink(io.StringIO):
+    def __init__(self, delay: float = 0.0):
+        super().__init__()
+        self.delay = delay
+
+    def write(self, text: str) -> int:
+        if self.delay:
+            time.sleep(self.delay)
+        # Drop the text; only the cost of the write call matters
+        return len(text)
+
+
+def old_move(logger: logging.Logger, move: chess.Move, ply: int):
+    """What every move logged before: messages rendered eagerly with f-strings."""
+    logger.info(f"Playing move: {move.uci()}")
+    logger.info(f"Move trace g1 ply {ply} (engine): " + " ".join(
+        f"{stage} {seconds * 1000:.1f}" for stage, seconds in SPANS.items()
+    ) + " ms")
+
+
+def new_move(logger: logging.Logger, move: chess.Move, ply: int):
+    logger.info("Playing move: %s", move)
+    logger.info("Move trace %s ply %d (%s): %s ms", "g1", ply, "engine", _Spans(SPANS))
+
+
+def run(move_fn, use_queue: bool, json_lines: bool, delay: float) -> list[float]:
+    log_setup.configure_logging(use_queue=use_queue, json_lines=json_lines, stream=Sink(delay))
+    logger = logging.getLogger("bench")
+    move = chess.Move.from_uci("e2e4")
+    log_setup.current_game.set("g1")
+    samples = []
+    for ply in range(MOVES):
+        log_setup.current_ply.set(ply)
+        started = time.perf_counter()
+        move_fn(logger, move, ply)
+        samples.append(time.perf_counter() - started)
+    # Drain the queue outside the timed section
+    log_setup.stop_listener()
+    return samples
+
+
+def main():
+    slow = (int(sys.argv[1]) if len(sys.argv) > 1 else SLOW_SINK_DELAY_US) / 1e6
+    setups = (
+        ("sync text, f-strings (old)", old_move, False, False),
+        ("queue text", new_move, True, False),
+        ("queue json", new_move, True, True),
+    )
+    print(f"{MOVES} moves, 2 log records each; time spent in the caller per move")
+    print(f"{'setup':<28} {'sink':>6} {'mean (us)':>10} {'p99 (us)':>10}")
+    for sink_name, delay in (("fast", 0.0), ("slow", slow)):
+        for name, move_fn, use_queue, json_lines in setups:
+            samples = sorted(run(move_fn, use_queue, json_lines, delay))
+            mean = sum(samples) / len(samples)
+            print(f"{name:<28} {sink_name:>6} {mean * 1e6:>10.1f} {percentile(samples, 99) * 1e6:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Microbenchmark: parsing the /api/bot/online response to pick an opponent.
+
+Compares the old approach (decode every line into a list of dicts, then
+filter) with building a roster snapshot line by line and with the
+early-exit reservoir sample. Reports time and peak traced memory per pick.
+
+Usage: python DRFizzle-BOT-Lichess/bench_roster_parse.py [recorded.ndjson]
+Without a file, a 2,000-bot response shaped like the Lichess one is generated.
+"""
+
+import sys
+import json
+import random
+import timeit
+import tracemalloc
+
+from roster import Roster, parse_lines, sample_opponent
+
+BOTS = 2000
+REPEAT = 20
+PERF = 'bullet'
+MIN_RATING, MAX_RATING = 0, 1700
+
+
+def synthetic_response(count: int, seed: int = 1) -> list[bytes]:
+    rng = random.Random(seed)
+    lines = []
+    for i in range(count):
+        name = f"Bot{i:04d}"
+        perfs = {
+            perf: {"games": rng.randrange(20000), "rating": rng.randrange(800, 3000),
+                   "rd": rng.randrange(45, 150), "prog": rng.randrange(-50, 50)}
+            for perf in ('bullet', 'blitz', 'rapid', 'classical', 'correspondence', 'chess960')
+        }
+        bot = {
+            "id": name.lower(), "username": name, "title": "BOT", "perfs": perfs,
+            "createdAt": 1600000000000 + i, "seenAt": 1700000000000 + i,
+            "playTime": {"total": rng.randrange(10 ** 7), "tv": rng.randrange(10 ** 5)},
+            "profile": {"bio": "Engine bot " * 5, "links": f"https://github.com/{name}"},
+        }
+        lines.append(json.dumps(bot).encode('utf-8'))
+    return lines
+
+
+def list_then_filter(lines: list[bytes]) -> dict | None:
+    """The previous implementation: materialise the whole list, then filter it."""
+    bots = []
+    for line in lines:
+        if line:
+            bots.append(json.loads(line.decode('utf-8')))
+    eligible = []
+    for bot in bots:
+        rating = bot.get('perfs', {}).get(PERF, {}).get('rating', 1500)
+        if rating <= MAX_RATING:
+            eligible.append({'username': bot.get('username') or bot.get('id'), 'rating': rating})
+    return random.choice(eligible) if eligible else None
+
+
+def roster_snapshot(lines: list[bytes]) -> dict | None:
+    return Roster.from_bots(parse_lines(lines)).pick(PERF, MIN_RATING, MAX_RATING)
+
+
+def streaming_sample(lines: list[bytes]) -> dict | None:
+    return sample_opponent(parse_lines(lines), PERF, MIN_RATING, MAX_RATING)
+
+
+def peak_kib(func, lines: list[bytes]) -> float:
+    tracemalloc.start()
+    func(lines)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak / 1024
+
+
+def main():
+    if len(sys.argv) > 1:
+        with open(sys.argv[1], 'rb') as f:
+            lines = f.read().splitlines()
+    else:
+        lines = synthetic_response(BOTS)
+    print(f"{len(lines)} bots, {sum(len(line) for line in lines) / 1024:.0f} KiB of NDJSON")
+    print(f"{'method':<20} {'time (ms)':>10} {'peak (KiB)':>11}")
+    for name, func in (("list then filter", list_then_filter),
+                       ("roster snapshot", roster_snapshot),
+                       ("streaming sample", streaming_sample)):
+        seconds = timeit.timeit(lambda: func(lines), number=REPEAT) / REPEAT
+        print(f"{name:<20} {seconds * 1000:>10.2f} {peak_kib(func, lines):>11.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""
+Graceful drain: stop taking new games, let the running ones finish, then exit.
+
+SIGUSR1 starts a drain without a deadline. SIGTERM and SIGINT start one
+with a deadline, or add the deadline to a drain already running. Games
+still running when the deadline passes are resigned. The signal handlers
+only record the request, and the main loop polls it and does the work:
+closing streams, resigning or shutting engines down from inside a handler
+would interrupt whatever the main thread was doing at that moment. A
+repeated signal changes nothing and is only counted. The exit status tells
+the runner how the drain went: 0 when every game was played to the end,
+otherwise EXIT_FORFEITED plus the number of games resigned at the
+deadline.
+"""
+
+import time
+import signal
+import logging
+
+logger = logging.getLogger(__name__)
+
+DRAIN_POLL_INTERVAL = 0.5  # Seconds between checks of the drain state by the main loop
+RESIGN_WAIT = 5.0  # Seconds the resigned games get to wind down before the engines are closed
+EXIT_FORFEITED = 64  # Exit status base when games were resigned at the deadline (64 + count)
+MAX_EXIT_STATUS = 127
+
+
+class Drain:
+    def __init__(self, deadline: float):
+        # Seconds from the terminate signal until the remaining games are resigned
+        self.deadline_seconds = deadline
+        self.signum: int | None = None
+        self.deadline: float | None = None
+        self.repeats = 0
+        self.started: float | None = None
+        # Games that were running when the drain began, and the ones resigned at the deadline
+        self.games: set[str] = set()
+        self.forfeited: set[str] = set()
+        # Games that started during the drain and were aborted
+        self.refused = 0
+        self._announced_deadline = False
+
+    @property
+    def requested(self) -> bool:
+        return self.signum is not None
+
+    def request(self, signum: int, with_deadline: bool):
+        """Record a drain signal. Only assigns attributes, so it is safe in a signal handler."""
+        if self.deadline is not None or (self.requested and not with_deadline):
+            self.repeats += 1
+            return
+        if self.signum is None:
+            self.signum = signum
+        if with_deadline:
+            self.deadline = time.monotonic() + self.deadline_seconds
+
+    def begin(self, active_games: set[str]):
+        self.games = set(active_games)
+        self.started = time.monotonic()
+        logger.info(f"Received {signal.Signals(self.signum).name}: draining {len(self.games)} active game(s), "
+                    f"no new games")
+
+    def expired(self) -> bool:
+        """True once the deadline has passed; logs the deadline the first time one is seen."""
+        if self.deadline is None:
+            return False
+        if not self._announced_deadline:
+            self._announced_deadline = True
+            logger.info(f"Drain deadline in {max(0.0, self.deadline - time.monotonic()):.0f}s; "
+                        f"games still running then are resigned")
+        return time.monotonic() >= self.deadline
+
+    def record_forfeit(self, game_id: str):
+        self.forfeited.add(game_id)
+
+    @property
+    def drained(self) -> int:
+        return len(self.games - self.forfeited)
+
+    def exit_status(self) -> int:
+        if not self.forfeited:
+            return 0
+        return min(EXIT_FORFEITED + len(self.forfeited), MAX_EXIT_STATUS)
+
+    def log_summary(self):
+        if not self.requested or self.started is None:
+            return
+        logger.info(f"Drain finished after {time.monotonic() - self.started:.1f}s: {self.drained} game(s) "
+                    f"played to the end, {len(self.forfeited)} resigned at the deadline, "
+                    f"{self.refused} started during the drain and aborted, "
+                    f"{self.repeats} repeated signal(s) ignored")
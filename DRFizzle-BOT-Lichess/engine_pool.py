@@ -0,0 +1,265 @@
+"""
+Pool of Stockfish processes leased to games.
+
+Each active game holds its own UCI process for its whole lifetime, so
+concurrent games never share a pipe and the engine hash stays warm for the
+game that is using it. Processes are reset with ``ucinewgame`` when they are
+returned and the pool grows/shrinks between its bounds as demand changes.
+"""
+
+import time
+import asyncio
+import threading
+import logging
+import chess.engine
+
+logger = logging.getLogger(__name__)
+
+ENGINE_IDLE_TIMEOUT = 120  # Seconds an idle process above min_size is kept alive
+
+
+class EnginePoolError(Exception):
+    pass
+
+
+class EnginePool:
+    def __init__(self, path: str, options: dict, min_size: int = 1, max_size: int = 1,
+                 idle_timeout: float = ENGINE_IDLE_TIMEOUT):
+        self.path = path
+        self.options = dict(options)
+        self.min_size = max(0, min(min_size, max_size))
+        self.max_size = max(1, max_size)
+        self.idle_timeout = idle_timeout
+        # Idle processes as (engine, released_at) pairs, most recently used last
+        self._idle: list[tuple[chess.engine.SimpleEngine, float]] = []
+        self._leased: dict[chess.engine.SimpleEngine, str] = {}
+        # Processes being spawned count towards size so the bound holds while popen runs
+        self._spawning = 0
+        self._closed = False
+        self._cond = threading.Condition()
+
+    @property
+    def size(self) -> int:
+        with self._cond:
+            return len(self._idle) + len(self._leased) + self._spawning
+
+    @property
+    def in_use(self) -> int:
+        with self._cond:
+            return len(self._leased)
+
+    def start(self):
+        """Pre-spawn min_size processes. Raises if the engine cannot be started."""
+        engines = [self._spawn() for _ in range(self.min_size)]
+        now = time.monotonic()
+        with self._cond:
+            self._idle.extend((engine, now) for engine in engines)
+        logger.info(f"Engine pool started with {len(engines)} process(es) (max {self.max_size})")
+
+    def _spawn(self) -> chess.engine.SimpleEngine:
+        engine = chess.engine.SimpleEngine.popen_uci(self.path)
+        try:
+            engine.configure(self.options)
+        except Exception:
+            engine.close()
+            raise
+        return engine
+
+    def lease(self, game_id: str, timeout: float | None = None) -> chess.engine.SimpleEngine:
+        """Lease a process to game_id, spawning one if the pool is below max_size."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while True:
+                if self._closed:
+                    raise EnginePoolError("Engine pool is closed")
+                if self._idle:
+                    engine, _ = self._idle.pop()
+                    self._leased[engine] = game_id
+                    return engine
+                if len(self._leased) + self._spawning < self.max_size:
+                    self._spawning += 1
+                    break
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    raise EnginePoolError(f"No engine available for game {game_id}")
+                self._cond.wait(remaining)
+
+        try:
+            engine = self._spawn()
+        except Exception:
+            with self._cond:
+                self._spawning -= 1
+                self._cond.notify()
+            raise
+        with self._cond:
+            self._spawning -= 1
+            self._leased[engine] = game_id
+        logger.info("Engine pool grew to %s process(es)", self.size)
+        return engine
+
+    def release(self, engine: chess.engine.SimpleEngine):
+        """Return a leased process. It is reset with ucinewgame or discarded if unhealthy."""
+        with self._cond:
+            game_id = self._leased.pop(engine, None)
+        healthy = not self._closed
+        if healthy:
+            try:
+                # The ping cancels a ponder search still running from the last move
+                engine.ping()
+                engine.protocol.loop.call_soon_threadsafe(engine.protocol.send_line, "ucinewgame")
+                engine.ping()
+            except Exception as e:
+                logger.warning("Discarding engine used by game %s: %s", game_id, e)
+                healthy = False
+        if not healthy:
+            self._close_engine(engine)
+        with self._cond:
+            if healthy:
+                self._idle.append((engine, time.monotonic()))
+            self._cond.notify()
+        self.shrink()
+
+    def shrink(self):
+        """Close processes that have been idle longer than idle_timeout, down to min_size."""
+        cutoff = time.monotonic() - self.idle_timeout
+        expired = []
+        with self._cond:
+            while (self._idle and self._idle[0][1] < cutoff
+                   and len(self._idle) + len(self._leased) > self.min_size):
+                expired.append(self._idle.pop(0)[0])
+        for engine in expired:
+            self._close_engine(engine)
+        if expired:
+            logger.info("Engine pool shrank to %s process(es)", self.size)
+
+    def _close_engine(self, engine: chess.engine.SimpleEngine):
+        try:
+            engine.quit()
+        except Exception:
+            try:
+                engine.close()
+            except Exception:
+                pass
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            engines = [engine for engine, _ in self._idle] + list(self._leased)
+            self._idle.clear()
+            self._leased.clear()
+            self._cond.notify_all()
+        for engine in engines:
+            self._close_engine(engine)
+
+
+class AsyncEnginePool:
+    """
+    asyncio counterpart of EnginePool for the async runtime.
+
+    Holds chess.engine.UciProtocol objects driven directly by the running event
+    loop, so no per-engine background thread is needed.
+    """
+
+    def __init__(self, path: str, options: dict, min_size: int = 1, max_size: int = 1,
+                 idle_timeout: float = ENGINE_IDLE_TIMEOUT):
+        self.path = path
+        self.options = dict(options)
+        self.min_size = max(0, min(min_size, max_size))
+        self.max_size = max(1, max_size)
+        self.idle_timeout = idle_timeout
+        self._idle: list[tuple[chess.engine.UciProtocol, float]] = []
+        self._leased: dict[chess.engine.UciProtocol, str] = {}
+        self._spawning = 0
+        self._closed = False
+        self._cond = asyncio.Condition()
+
+    @property
+    def size(self) -> int:
+        return len(self._idle) + len(self._leased) + self._spawning
+
+    @property
+    def in_use(self) -> int:
+        return len(self._leased)
+
+    async def start(self):
+        engines = await asyncio.gather(*(self._spawn() for _ in range(self.min_size)))
+        now = time.monotonic()
+        self._idle.extend((engine, now) for engine in engines)
+        logger.info(f"Engine pool started with {len(engines)} process(es) (max {self.max_size})")
+
+    async def _spawn(self) -> chess.engine.UciProtocol:
+        _, engine = await chess.engine.popen_uci(self.path)
+        try:
+            await engine.configure(self.options)
+        except Exception:
+            await self._close_engine(engine)
+            raise
+        return engine
+
+    async def lease(self, game_id: str, timeout: float | None = None) -> chess.engine.UciProtocol:
+        async with self._cond:
+            await asyncio.wait_for(self._cond.wait_for(
+                lambda: self._closed or self._idle
+                or len(self._leased) + self._spawning < self.max_size
+            ), timeout)
+            if self._closed:
+                raise EnginePoolError("Engine pool is closed")
+            if self._idle:
+                engine, _ = self._idle.pop()
+                self._leased[engine] = game_id
+                return engine
+            self._spawning += 1
+        try:
+            engine = await self._spawn()
+        finally:
+            async with self._cond:
+                self._spawning -= 1
+                self._cond.notify()
+        self._leased[engine] = game_id
+        logger.info("Engine pool grew to %s process(es)", self.size)
+        return engine
+
+    async def release(self, engine: chess.engine.UciProtocol):
+        game_id = self._leased.pop(engine, None)
+        healthy = not self._closed
+        if healthy:
+            try:
+                await engine.ping()
+                engine.send_line("ucinewgame")
+                await engine.ping()
+            except Exception as e:
+                logger.warning("Discarding engine used by game %s: %s", game_id, e)
+                healthy = False
+        if not healthy:
+            await self._close_engine(engine)
+        async with self._cond:
+            if healthy:
+                self._idle.append((engine, time.monotonic()))
+            self._cond.notify()
+        await self.shrink()
+
+    async def shrink(self):
+        cutoff = time.monotonic() - self.idle_timeout
+        expired = []
+        while (self._idle and self._idle[0][1] < cutoff
+               and len(self._idle) + len(self._leased) > self.min_size):
+            expired.append(self._idle.pop(0)[0])
+        for engine in expired:
+            await self._close_engine(engine)
+        if expired:
+            logger.info("Engine pool shrank to %s process(es)", self.size)
+
+    async def _close_engine(self, engine: chess.engine.UciProtocol):
+        try:
+            await asyncio.wait_for(engine.quit(), 5)
+        except Exception:
+            engine.transport.close()
+
+    async def close(self):
+        self._closed = True
+        engines = [engine for engine, _ in self._idle] + list(self._leased)
+        self._idle.clear()
+        self._leased.clear()
+        async with self._cond:
+            self._cond.notify_all()
+        await asyncio.gather(*(self._close_engine(engine) for engine in engines))
@@ -0,0 +1,81 @@
+"""
+Per-game board state kept across game stream events.
+
+Lichess sends the full move list with every gameState event. Instead of
+replaying the whole game each time, the session keeps its board and only
+pushes the moves that were appended since the previous event.
+"""
+
+import logging
+import chess
+
+from time_manager import ClockState
+from tracing import MoveTrace
+
+logger = logging.getLogger(__name__)
+
+# Statuses of a game still being played; every other status ends it, including ones Lichess adds later
+LIVE_STATUSES = ('created', 'started')
+
+
+def final_status(event: dict) -> str | None:
+    """End status carried by a gameFull or gameState event, or None while the game goes on."""
+    if event.get('type') == 'gameFull':
+        status = event.get('state', {}).get('status')
+    elif event.get('type') == 'gameState':
+        status = event.get('status')
+    else:
+        return None
+    return None if status is None or status in LIVE_STATUSES else status
+
+
+class GameSession:
+    def __init__(self, game_id: str, initial_fen: str = chess.STARTING_FEN, chess960: bool = False):
+        self.game_id = game_id
+        self.initial_fen = initial_fen
+        self.chess960 = chess960
+        self.variant = 'chess960' if chess960 else 'standard'
+        # Our colour, taken from the players of the gameFull event
+        self.is_white = True
+        self.board = chess.Board(initial_fen, chess960=chess960)
+        # Move list (space separated UCI) the board currently reflects
+        self.moves = ""
+        self.rebuilds = 0
+        self.clock = ClockState()
+        # Move list at the time we last posted a move, so a resync never submits twice
+        self.submitted_moves: str | None = None
+        # Reply the engine is pondering on after our last move, if any
+        self.ponder_move: chess.Move | None = None
+        self.ponder_hits = 0
+        self.ponder_misses = 0
+        self.book_hits = 0
+        self.tablebase_hits = 0
+        # Latency spans of the move we are answering the latest game stream event with
+        self.trace: MoveTrace | None = None
+
+    def sync(self, moves: str) -> chess.Board:
+        """Bring the board up to date with the move list from a game stream event."""
+        moves = moves.strip()
+        if self._extends(moves):
+            try:
+                for move in moves[len(self.moves):].split():
+                    self.board.push_uci(move)
+                self.moves = moves
+                return self.board
+            except ValueError as e:
+                logger.warning("Game %s: %s; rebuilding board", self.game_id, e)
+        # The move list is not an extension of ours (e.g. a takeback): replay from scratch
+        self.rebuilds += 1
+        self.moves = ""
+        self.board = chess.Board(self.initial_fen, chess960=self.chess960)
+        for move in moves.split():
+            self.board.push_uci(move)
+        self.moves = moves
+        return self.board
+
+    def _extends(self, moves: str) -> bool:
+        """True if moves is our current move list followed by zero or more new moves."""
+        known = self.moves
+        if not moves.startswith(known):
+            return False
+        return not known or len(moves) == len(known) or moves[len(known)] == ' '
@@ -0,0 +1,108 @@
+"""
+Shared HTTP layer for every Lichess call.
+
+PooledTokenSession is the berserk.TokenSession used by the client, with a
+connection pool sized for the concurrent game streams plus REST traffic,
+keep-alive, per-endpoint timeouts and optional pre-warming. The online-bot
+fetch goes through the same session instead of a one-off requests.get, and
+the pool reports how many connections were opened versus reused. Every
+request passes through the rate governor first.
+"""
+
+import re
+import logging
+import berserk
+import requests
+from requests.adapters import HTTPAdapter
+
+from rate_limit import RateGovernor, endpoint_class
+
+logger = logging.getLogger(__name__)
+
+API_URL = "https://lichess.org"
+STREAM_READ_TIMEOUT = 30  # Lichess sends a keep-alive line every few seconds; silence means a dead stream
+
+# (path pattern, (connect timeout, read timeout)); the first match wins
+ENDPOINT_TIMEOUTS = [
+    (re.compile(r"/api/bot/game/[^/]+/move/"), (3.05, 5)),
+    (re.compile(r"/api/challenge/"), (3.05, 10)),
+    (re.compile(r"/api/bot/online"), (3.05, 15)),
+]
+DEFAULT_TIMEOUT = (3.05, 10)
+
+
+def timeout_for(path: str, stream: bool = False) -> tuple[float, float]:
+    """Timeout for a request to path. Streams only bound the gap between two lines."""
+    if stream and "/api/bot/online" not in path:
+        return (DEFAULT_TIMEOUT[0], STREAM_READ_TIMEOUT)
+    for pattern, timeout in ENDPOINT_TIMEOUTS:
+        if pattern.search(path):
+            return timeout
+    return DEFAULT_TIMEOUT
+
+
+class PooledTokenSession(berserk.TokenSession):
+    def __init__(self, token: str, pool_size: int, governor: RateGovernor | None = None):
+        super().__init__(token)
+        self.pool_size = pool_size
+        self.governor = governor
+        self.adapter = HTTPAdapter(pool_connections=2, pool_maxsize=pool_size, pool_block=False)
+        self.mount("https://", self.adapter)
+        self.mount("http://", self.adapter)
+        self.headers["Connection"] = "keep-alive"
+        self.prewarmed = 0
+
+    def request(self, method, url, **kwargs):
+        kwargs.setdefault("timeout", timeout_for(url, kwargs.get("stream", False)))
+        if self.governor is None:
+            return super().request(method, url, **kwargs)
+        self.governor.acquire(endpoint_class(url))
+        response = super().request(method, url, **kwargs)
+        self.governor.record_response(response.status_code, response.headers)
+        return response
+
+    def prewarm(self, base_url: str, count: int):
+        """Open up to count connections ahead of time so the first moves skip the TLS handshake."""
+        count = min(count, self.pool_size)
+        if count <= 0:
+            return
+        pool = self._pool_for(base_url)
+        # Check out all connections first so each one is a separate socket, then return them
+        conns = [pool._get_conn() for _ in range(count)]
+        opened = 0
+        for conn in conns:
+            try:
+                conn.connect()
+                opened += 1
+            except Exception as e:
+                logger.warning(f"Failed to pre-warm connection to {base_url}: {e}")
+        for conn in conns:
+            pool._put_conn(conn)
+        self.prewarmed += opened
+        logger.info(f"Pre-warmed {opened} connection(s) to {base_url}")
+
+    def _pool_for(self, base_url: str):
+        """The urllib3 pool requests will use for base_url (its key includes the TLS settings)."""
+        request = requests.Request("GET", base_url).prepare()
+        if hasattr(self.adapter, "get_connection_with_tls_context"):
+            # Same verify setting (e.g. REQUESTS_CA_BUNDLE) that request() ends up using
+            settings = self.merge_environment_settings(base_url, {}, None, None, None)
+            return self.adapter.get_connection_with_tls_context(request, verify=settings["verify"])
+        return self.adapter.get_connection(base_url)
+
+    def connection_stats(self) -> tuple[int, int]:
+        """(new connections, reused connections) across all pools of this session."""
+        manager = self.adapter.poolmanager
+        new = requests_made = 0
+        for key in list(manager.pools.keys()):
+            pool = manager.pools.get(key)
+            if pool is None:
+                continue
+            new += pool.num_connections
+            requests_made += pool.num_requests
+        # A pre-warmed connection is reused by the first request that picks it up
+        return new, max(0, requests_made - (new - self.prewarmed))
+
+    def log_summary(self):
+        new, reused = self.connection_stats()
+        logger.info(f"HTTP: {new} new connection(s), {reused} request(s) on reused connections")
@@ -6,146 +6,496 @@ Plays casual standard games at low rating.
 
 import os
 import sys
-import json
 import time
-import random
 import threading
 import logging
 import signal
 import re
-import requests
+from typing import Iterator
 import chess
 import chess.engine
 import berserk
 
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s'
+from engine_pool import EnginePool
+from game_session import GameSession, final_status
+from time_manager import TimeManager
+from opening_book import OpeningBook
+from tablebase import Tablebase
+from streams import ResilientStream, StreamStats, StreamGone, GONE_STATUSES
+from http_session import PooledTokenSession, API_URL
+from roster import Roster, RosterCache, parse_lines, sample_opponent, speed_for_clock
+from scheduler import OpponentScheduler
+from wakeup import Wakeup, IdleGapStats
+from rate_limit import RateGovernor, CHALLENGE
+from tracing import LatencyTracker, LineStamps, MoveTrace, decode_lines
+from log_setup import configure_logging, current_game, current_ply, THROTTLE
+from profiler import SamplingProfiler, SAMPLE_INTERVAL, CONTINUOUS_INTERVAL
+from recording import StreamRecorder, game_stream, stream_name
+from drain import Drain, DRAIN_POLL_INTERVAL, RESIGN_WAIT
+from metrics import MetricsRegistry, MetricsServer, labelled, resident_memory_bytes
+import ponder
+
+# LOG_QUEUE=1 moves log formatting and writing to a background thread; LOG_JSON=1 writes JSON lines
+configure_logging(
+    use_queue=os.environ.get('LOG_QUEUE', '0') == '1',
+    json_lines=os.environ.get('LOG_JSON', '0') == '1'
 )
 logger = logging.getLogger(__name__)
 
-STOCKFISH_PATH = "/nix/store/l4y0zjkvmnbqwz8grmb34d280n599i75-stockfish-17/bin/stockfish"
+STOCKFISH_PATH = os.environ.get(
+    'STOCKFISH_PATH', "/nix/store/l4y0zjkvmnbqwz8grmb34d280n599i75-stockfish-17/bin/stockfish"
+)
+
+# Lichess server the bot talks to; point it at local_lichess.py for offline runs
+LICHESS_URL = os.environ.get('LICHESS_URL', API_URL).rstrip('/')
 
 STOCKFISH_DEPTH = 1
 STOCKFISH_THREADS = 1
 STOCKFISH_HASH = 1
 STOCKFISH_SKILL_LEVEL = 0  # 0-20, 0 is weakest
 
+# Time reserved per move for network and host latency when budgeting the clock
+MOVE_OVERHEAD_MS = int(os.environ.get('MOVE_OVERHEAD_MS', '300'))
+
+# Polyglot opening books per variant; a variant without a book always uses the engine
+BOOK_PATHS = {
+    'standard': os.environ.get('BOOK_PATH', ''),
+    'chess960': os.environ.get('BOOK_CHESS960_PATH', ''),
+}
+
+# Directory with Syzygy tablebase files; solved endgames are played without the engine
+SYZYGY_PATH = os.environ.get('SYZYGY_PATH', '')
+
+# Keep searching the expected reply while the opponent thinks (ponderhit on a correct guess)
+PONDER = os.environ.get('PONDER', '0') == '1'
+
+CHALLENGE_MIN_RATING = 0
 CHALLENGE_MAX_RATING = 1700
 CHALLENGE_CLOCK_LIMIT = 60  # 1 minute in seconds
 CHALLENGE_CLOCK_INCREMENT = 0  # 0 seconds increment
-CHALLENGE_INTERVAL = 5  # Seconds between challenge attempts
+CHALLENGE_INTERVAL = 5  # Seconds before retrying when no challenge could be sent
+CHALLENGE_IDLE_WAIT = 60  # Longest wait with all slots busy; releases normally wake the challenger first
+# Opponents are rated by the perf type the challenge clock is played in (bullet for 1+0)
+CHALLENGE_PERF = speed_for_clock(CHALLENGE_CLOCK_LIMIT, CHALLENGE_CLOCK_INCREMENT)
+
+# Comma-separated bot names that are never challenged
+CHALLENGE_BLOCKLIST = {name.strip().lower() for name in os.environ.get('CHALLENGE_BLOCKLIST', '').split(',')
+                       if name.strip()}
+
+# Seconds between background refreshes of the online-bot roster used to pick opponents
+ROSTER_REFRESH_INTERVAL = int(os.environ.get('ROSTER_REFRESH_INTERVAL', '60'))
+# Bots drawn from the roster per challenge and ranked by the opponent scheduler
+CHALLENGE_CANDIDATES = 8
+# Bots requested when picking straight from the API because no fresh roster is available
+ROSTER_SAMPLE_LIMIT = 50
+
+ALLOWED_VARIANTS = ['standard', 'chess960']
+ACCEPT = "accept"
+PLAY = "play"
+# What a game loop does after a game stream event (see _on_game_event)
+MY_TURN = "my turn"
+GAME_OVER = "game over"
+
+# Number of games played in parallel; each game occupies one slot
+MAX_CONCURRENT_GAMES = max(1, int(os.environ.get('MAX_CONCURRENT_GAMES', '4')))
+# Seconds a slot stays reserved for an accepted incoming challenge until its gameStart arrives
+ACCEPTED_START_WAIT = 15
+
+# Stockfish processes kept warm in the engine pool; it grows up to one per game slot
+ENGINE_POOL_MIN_SIZE = int(os.environ.get('ENGINE_POOL_MIN_SIZE', str(min(2, MAX_CONCURRENT_GAMES))))
+ENGINE_POOL_MAX_SIZE = MAX_CONCURRENT_GAMES
+
+# HTTP connections: one per game stream plus the event stream, plus headroom for REST calls
+HTTP_POOL_SIZE = MAX_CONCURRENT_GAMES + 1 + int(os.environ.get('HTTP_REST_CONNECTIONS', '4'))
+# Connections opened at startup so the first calls skip the TCP/TLS handshake
+HTTP_PREWARM_CONNECTIONS = int(os.environ.get('HTTP_PREWARM_CONNECTIONS', '0'))
+
+# A game stream that stays disconnected longer than this is given up (the game is lost on time anyway)
+GAME_STREAM_MAX_GAP = 120
+
+# Local Prometheus text endpoint at http://METRICS_HOST:METRICS_PORT/metrics; port 0 disables it
+METRICS_HOST = os.environ.get('METRICS_HOST', '127.0.0.1')
+METRICS_PORT = int(os.environ.get('METRICS_PORT', '9108'))
+
+# SIGUSR2 starts and stops a sampling profiler; collapsed-stack dumps are written here
+PROFILE_DIR = os.environ.get('PROFILE_DIR', 'profiles')
+# Sample at a low rate for the whole shift, dumped at shutdown
+PROFILE_CONTINUOUS = os.environ.get('PROFILE_CONTINUOUS', '0') == '1'
+
+# Directory to capture the raw event and game streams to, for offline replays (replay.py); empty disables
+RECORD_DIR = os.environ.get('RECORD_DIR', '')
+
+# Seconds after SIGTERM/SIGINT until games still running are resigned; the runner kills the bot 30s after SIGTERM
+DRAIN_DEADLINE = float(os.environ.get('DRAIN_DEADLINE', '20'))
+EXIT_STARTUP_FAILED = 1  # Exit status when the bot cannot log in or start its engine pool
+
+# "threads" (one thread per game) or "async" (all streams and engines on one event loop)
+BOT_RUNTIME = os.environ.get('BOT_RUNTIME', 'threads')
 
 
 class LichessBot:
     def __init__(self, api_token: str):
         self.api_token = api_token
-        self.session = berserk.TokenSession(api_token)
-        self.client = berserk.Client(self.session)
+        # Token buckets per endpoint class shared by every API call, with a global pause on 429
+        self.governor = RateGovernor()
+        self.session = PooledTokenSession(api_token, HTTP_POOL_SIZE, self.governor)
+        self.client = berserk.Client(self.session, base_url=LICHESS_URL)
         self.username: str = ""
-        self.engine: chess.engine.SimpleEngine | None = None
-        self.is_playing = False
+        self.engine_pool: EnginePool | None = None
+        # Depth stays a hard cap on top of the clock budget
+        self.time_manager = TimeManager(MOVE_OVERHEAD_MS / 1000, depth=STOCKFISH_DEPTH)
+        self.ponder_stats = ponder.PonderStats()
+        self.book = OpeningBook(BOOK_PATHS)
+        self.tablebase = Tablebase(SYZYGY_PATH)
+        self.roster = RosterCache(self._get_online_bots, ROSTER_REFRESH_INTERVAL)
+        self.scheduler = OpponentScheduler()
+        # Set by game finishes, slot releases and challenge answers to run the challenger right away
+        self.wakeup = Wakeup()
+        self.idle_gaps = IdleGapStats()
+        # Per-move spans from game stream line to move POST, per game and for the shift
+        self.latency = LatencyTracker()
+        self.max_games = MAX_CONCURRENT_GAMES
+        # Game ids currently occupying a slot, guarded by _slots_lock
+        self.active_games: set[str] = set()
+        # Accepted incoming challenges whose game has not started yet -> reservation deadline
+        self._reserved: dict[str, float] = {}
+        self._slots_lock = threading.Lock()
         self.challenger_running = True
+        # Cleared on shutdown; the event and game streams stop reconnecting
+        self.running = True
+        self.stream_stats = StreamStats()
         # When True the bot is in standby mode: stop issuing/accepting new games
         self.standby = False
-        
+        # Set by SIGUSR1/SIGTERM/SIGINT; the main loop stops taking games and waits for the running ones
+        self.drain = Drain(DRAIN_DEADLINE)
+        self.recorder = StreamRecorder(RECORD_DIR) if RECORD_DIR else None
+        self.metrics = MetricsRegistry()
+        self._register_metrics()
+        self.profiler = SamplingProfiler("on-demand", PROFILE_DIR, SAMPLE_INTERVAL)
+        self.shift_profiler: SamplingProfiler | None = None
+        if PROFILE_CONTINUOUS:
+            self.shift_profiler = SamplingProfiler("shift", PROFILE_DIR, CONTINUOUS_INTERVAL)
+
+    def _register_metrics(self):
+        m = self.metrics
+        self.games_started = m.counter("games_started_total", "Games that took a slot")
+        self.games_finished = m.counter("games_finished_total", "Finished games by end status")
+        self.moves_played = m.counter("moves_played_total", "Moves posted, by source (book, tablebase, engine)")
+        self.think_time = m.histogram("engine_think_seconds", "Time the engine spent on a move")
+        self.move_post_latency = m.histogram("move_post_seconds", "Round trip of the move POST")
+        self.event_to_move = m.histogram("event_to_move_seconds",
+                                         "From the game stream event to the move POST returning")
+        m.counter_fn("challenges_total", "Outgoing challenges by outcome", lambda: labelled({
+            'sent': self.scheduler.sent + self.scheduler.withdrawn,
+            'accepted': self.scheduler.accepted,
+            'declined': self.scheduler.declined,
+            'unanswered': self.scheduler.unanswered,
+            'withdrawn': self.scheduler.withdrawn,
+        }, 'outcome'))
+        m.counter_fn("stream_reconnects_total", "Stream reconnects (events stream or game streams)",
+                     self._stream_reconnects)
+        m.counter_fn("rate_limited_total", "HTTP 429 responses from Lichess", lambda: self.governor.rate_limited)
+        m.gauge_fn("active_games", "Games currently holding a slot", lambda: self.max_games - self.free_slots)
+        m.gauge_fn("free_slots", "Game slots available for new games", lambda: self.free_slots)
+        m.gauge_fn("engine_pool_processes", "Engine processes by state", self._engine_pool_occupancy)
+        m.gauge_fn("rate_limit_tokens", "Tokens left per endpoint class",
+                   lambda: labelled(self.governor.levels(), 'endpoint'))
+        m.gauge_fn("resident_memory_bytes", "Resident set size of the bot process", resident_memory_bytes)
+
+    def _stream_reconnects(self) -> dict:
+        totals = {'events': 0, 'game': 0}
+        for name, count in dict(self.stream_stats.reconnects).items():
+            totals['events' if name == 'events' else 'game'] += count
+        return labelled(totals, 'stream')
+
+    def _engine_pool(self):
+        return self.engine_pool
+
+    def _engine_pool_occupancy(self) -> dict:
+        pool = self._engine_pool()
+        size, in_use = (pool.size, pool.in_use) if pool is not None else (0, 0)
+        return labelled({'in_use': in_use, 'idle': size - in_use}, 'state')
+
     def start(self):
         try:
             account = self.client.account.get()
-            self.username = account['username']
-            logger.info(f"Logged in as: {self.username}")
-            
-            if account.get('title') != 'BOT':
-                logger.warning("This account is not a BOT account.")
-                logger.info("You need to upgrade your account to a BOT account on Lichess.")
-                logger.info("Note: Once upgraded, you cannot play as a human anymore.")
-                return
-                
         except Exception as e:
             logger.error(f"Failed to authenticate: {e}")
-            return
+            return EXIT_STARTUP_FAILED
+        if not self._log_in(account):
+            return EXIT_STARTUP_FAILED
 
-        self._init_engine()
+        if self.recorder is not None:
+            self.recorder.start(self.username)
+        if not self._init_engine():
+            return EXIT_STARTUP_FAILED
+        self.session.prewarm(LICHESS_URL, HTTP_PREWARM_CONNECTIONS)
+        self.book.open()
+        self.tablebase.open()
         
         # Register signal handlers: standby and graceful shutdown
         try:
             signal.signal(signal.SIGUSR1, self._on_standby_signal)
+            signal.signal(signal.SIGUSR2, self._on_profile_signal)
             signal.signal(signal.SIGTERM, self._on_terminate_signal)
             signal.signal(signal.SIGINT, self._on_terminate_signal)
         except Exception:
             # In some environments (e.g., non-main threads) signal registration may fail
             logger.debug("Failed to register signal handlers; signals may not work in this environment")
 
+        if self.shift_profiler is not None:
+            self.shift_profiler.start()
+        self.roster.start()
         threading.Thread(target=self._challenger_loop, daemon=True).start()
         logger.info("Started bot challenger thread")
         
         logger.info("Starting event stream...")
         logger.info("Bot is ready! Waiting for challenges and games...")
         
+        # The event stream runs on its own thread so the main thread is free to act on drain and profiler signals
+        events = threading.Thread(target=self._event_loop, name="events", daemon=True)
+        events.start()
         try:
-            for event in self.client.bots.stream_incoming_events():
-                if event['type'] == 'challenge':
-                    self._handle_challenge(event['challenge'])
-                elif event['type'] == 'gameStart':
-                    game_id = event['game'].get('id') or event['game'].get('gameId')
-                    if self.is_playing:
-                        logger.info(f"Ignoring game {game_id}: Already playing another game")
-                        try:
-                            self.client.bots.resign_game(game_id)
-                        except Exception:
-                            pass
-                        continue
-                    logger.info(f"Game started: {game_id}")
-                    self.is_playing = True
-                    threading.Thread(
-                        target=self._play_game,
-                        args=(game_id,),
-                        daemon=True
-                    ).start()
-        except KeyboardInterrupt:
-            logger.info("Shutting down...")
+            while events.is_alive() and not self.drain.requested:
+                events.join(DRAIN_POLL_INTERVAL)
+                self.profiler.poll()
+            if self.drain.requested:
+                self._drain_games()
         finally:
+            logger.info("Shutting down...")
             self.challenger_running = False
+            self.running = False
             self._cleanup()
+        return self.drain.exit_status()
 
-    def _init_engine(self):
-        logger.info("Initializing Stockfish engine...")
+    def _log_in(self, account: dict) -> bool:
+        """Take the username from the account; False if the account cannot play as a bot."""
+        self.username = account['username']
+        logger.info(f"Logged in as: {self.username}")
+        if account.get('title') != 'BOT':
+            logger.warning("This account is not a BOT account.")
+            logger.info("You need to upgrade your account to a BOT account on Lichess.")
+            logger.info("Note: Once upgraded, you cannot play as a human anymore.")
+            return False
+        return True
+
+    def _event_loop(self):
+        try:
+            events = ResilientStream(
+                "events",
+                lambda: parse_lines(self._stream_lines("/api/stream/event")),
+                lambda: self.running,
+                self.stream_stats
+            )
+            for event in events:
+                self._handle_event(event)
+        except Exception as e:
+            logger.error("Event stream failed: %s", e)
+
+    def _begin_drain(self):
+        """Stop taking new games; the challenger withdraws its pending challenges and stops."""
+        self.standby = True
+        self.wakeup.set('drain')
+        with self._slots_lock:
+            self.drain.begin(self.active_games)
+
+    def _draining(self) -> bool:
+        """Whether games are still running with time left before the drain deadline."""
+        return self.is_playing and not self.drain.expired()
+
+    def _begin_forfeit(self) -> tuple[list[str], float]:
+        """
+        Games still running at the drain deadline, recorded as forfeited, and how long
+        to wait for them to end once resigned.
+        """
+        with self._slots_lock:
+            game_ids = list(self.active_games)
+        for game_id in game_ids:
+            logger.warning("Drain deadline passed: resigning game %s", game_id)
+            self.drain.record_forfeit(game_id)
+        # Let the games see the result and hand their engines back before the pool closes
+        return game_ids, time.monotonic() + RESIGN_WAIT
+
+    def _drain_games(self):
+        """Wait for the active games to end; resign the ones still running at the deadline."""
+        self._begin_drain()
+        while self._draining():
+            time.sleep(DRAIN_POLL_INTERVAL)
+            self.profiler.poll()
+        if self.is_playing:
+            self._forfeit_games()
+
+    def _forfeit_games(self):
+        game_ids, deadline = self._begin_forfeit()
+        for game_id in game_ids:
+            self._resign_game(game_id)
+        while self.is_playing and time.monotonic() < deadline:
+            time.sleep(0.1)
+
+    def _resign_game(self, game_id: str):
+        try:
+            self.client.bots.resign_game(game_id)
+        except Exception as e:
+            logger.error("Failed to resign game %s: %s", game_id, e)
+
+    def _handle_event(self, event: dict):
+        """Dispatch one event from the incoming-event stream."""
+        if event['type'] == 'challenge':
+            self._handle_challenge(event['challenge'])
+        elif event['type'] == 'gameStart':
+            game_id = event['game'].get('id') or event['game'].get('gameId')
+            decision = self._review_game(game_id, event['game'])
+            if decision == PLAY:
+                self._start_game(game_id)
+            elif decision is not None:
+                self._refuse_game(game_id)
+        else:
+            self._record_event(event)
+
+    def _record_event(self, event: dict):
+        """Bookkeeping for the incoming events that need no API call."""
+        if event['type'] in ('challengeDeclined', 'challengeCanceled'):
+            self._record_challenge_outcome(event)
+        elif event['type'] == 'gameFinish':
+            self.wakeup.set('game finished')
+
+    def _review_game(self, game_id: str, game: dict) -> str | None:
+        """
+        Decide what to do with a gameStart event, taking a game slot when the game is played.
+        Returns PLAY, a refusal reason, or None if the game is already running. A refused
+        game has no moves yet, so the caller aborts it.
+        """
+        if self._is_active(game_id):
+            # Replayed for a running game after the event stream reconnected
+            return None
+        self._unreserve_slot(game_id)
+        if self.drain.requested:
+            logger.info("Ignoring game %s: draining", game_id)
+            self.drain.refused += 1
+            decision = "draining"
+        elif not self._acquire_slot(game_id):
+            logger.info("Ignoring game %s: All %s game slots are busy", game_id, self.max_games)
+            decision = "busy"
+        else:
+            decision = PLAY
+        if decision != PLAY:
+            # Not a game we play: take the challenge back instead of counting it as accepted
+            self.scheduler.record_withdrawn(game_id)
+            return decision
+        self.scheduler.record_game_start(game_id, game.get('opponent', {}).get('id'))
+        logger.info("Game started: %s (%s free slots)", game_id, self.free_slots)
+        self.games_started.inc()
+        self.wakeup.set('game started')
+        return PLAY
+
+    def _refuse_game(self, game_id: str):
+        try:
+            self.client.bots.abort_game(game_id)
+        except Exception:
+            self._resign_game(game_id)
+
+    def _start_game(self, game_id: str):
+        threading.Thread(
+            target=self._play_game,
+            args=(game_id,),
+            daemon=True
+        ).start()
+
+    @property
+    def free_slots(self) -> int:
+        with self._slots_lock:
+            return self.max_games - len(self.active_games)
+
+    @property
+    def open_slots(self) -> int:
+        """Free slots not reserved for an accepted incoming challenge; what new challenges may fill."""
+        now = time.monotonic()
+        with self._slots_lock:
+            self._reserved = {game_id: deadline for game_id, deadline in self._reserved.items() if deadline > now}
+            return self.max_games - len(self.active_games) - len(self._reserved)
+
+    def _reserve_slot(self, challenge_id: str):
+        with self._slots_lock:
+            self._reserved[challenge_id] = time.monotonic() + ACCEPTED_START_WAIT
+
+    def _unreserve_slot(self, challenge_id: str) -> bool:
+        with self._slots_lock:
+            return self._reserved.pop(challenge_id, None) is not None
+
+    @property
+    def is_playing(self) -> bool:
+        with self._slots_lock:
+            return bool(self.active_games)
+
+    def _acquire_slot(self, game_id: str) -> bool:
+        """Reserve a game slot for game_id. Returns False if no slot is free."""
+        with self._slots_lock:
+            if game_id in self.active_games:
+                return False
+            if len(self.active_games) >= self.max_games:
+                return False
+            self.active_games.add(game_id)
+        self.idle_gaps.slot_filled()
+        return True
+
+    def _is_active(self, game_id: str) -> bool:
+        with self._slots_lock:
+            return game_id in self.active_games
+
+    def _release_slot(self, game_id: str):
+        with self._slots_lock:
+            if game_id not in self.active_games:
+                return
+            self.active_games.discard(game_id)
+        self.idle_gaps.slot_freed()
+        self.wakeup.set('slot released')
+
+    def _engine_options(self) -> dict:
+        """Log the engine settings and return the UCI options every pooled engine gets."""
         logger.info(f"  Depth: {STOCKFISH_DEPTH}")
         logger.info(f"  Skill Level: {STOCKFISH_SKILL_LEVEL} (0=weakest, 20=strongest)")
         logger.info(f"  Threads: {STOCKFISH_THREADS}")
         logger.info(f"  Hash: {STOCKFISH_HASH} MB")
-        
+        logger.info(f"  Pool: {ENGINE_POOL_MIN_SIZE}-{ENGINE_POOL_MAX_SIZE} processes")
+        return {
+            "Threads": STOCKFISH_THREADS,
+            "Hash": STOCKFISH_HASH,
+            "Skill Level": STOCKFISH_SKILL_LEVEL
+        }
+
+    def _init_engine(self) -> bool:
+        logger.info("Initializing Stockfish engine...")
+        options = self._engine_options()
         try:
-            self.engine = chess.engine.SimpleEngine.popen_uci(STOCKFISH_PATH)
-            self.engine.configure({
-                "Threads": STOCKFISH_THREADS,
-                "Hash": STOCKFISH_HASH,
-                "Skill Level": STOCKFISH_SKILL_LEVEL
-            })
+            self.engine_pool = EnginePool(
+                STOCKFISH_PATH, options, min_size=ENGINE_POOL_MIN_SIZE, max_size=ENGINE_POOL_MAX_SIZE
+            )
+            self.engine_pool.start()
             logger.info("Stockfish engine initialized successfully")
+            return True
         except Exception as e:
             logger.error(f"Failed to initialize Stockfish: {e}")
-            sys.exit(1)
+            return False
 
     def _on_standby_signal(self, signum, frame):
-        """Signal handler to enter standby: stop accepting/challenging new games."""
-        logger.info(f"Received standby signal (signal={signum}). Entering standby mode.")
+        """Signal handler for SIGUSR1: drain without a deadline (stop taking games, finish the running ones)."""
         self.standby = True
+        self.drain.request(signum, with_deadline=False)
+
+    def _on_profile_signal(self, signum, frame):
+        """Signal handler for SIGUSR2: the main loop starts the sampling profiler, or stops it and dumps it."""
+        self.profiler.request_toggle()
 
     def _on_terminate_signal(self, signum, frame):
-        """Signal handler for SIGTERM/SIGINT to request graceful shutdown."""
-        logger.info(f"Received termination signal (signal={signum}). Initiating graceful shutdown.")
-        # Stop challenger and mark standby so no new games are accepted
-        self.challenger_running = False
+        """Signal handler for SIGTERM/SIGINT: drain, resigning the games still running at DRAIN_DEADLINE."""
         self.standby = True
-        # Attempt a graceful cleanup and then exit
-        try:
-            self._cleanup()
-        except Exception:
-            pass
-        sys.exit(0)
+        self.drain.request(signum, with_deadline=True)
 
-    def _handle_challenge(self, challenge: dict):
+    def _review_challenge(self, challenge: dict) -> str | None:
+        """
+        Decide what to do with an incoming challenge.
+        Returns ACCEPT, a decline reason, or None if the challenge should be ignored.
+        """
         challenge_id = challenge['id']
         challenger = challenge['challenger']['name']
         variant = challenge['variant']['key']
@@ -154,225 +504,535 @@ class LichessBot:
         
         # If in standby mode, decline all new challenges
         if getattr(self, 'standby', False):
-            logger.info(f"In standby: declining challenge {challenge_id} from {challenger}")
-            try:
-                self.client.bots.decline_challenge(challenge_id, reason="standby")
-            except Exception:
-                pass
-            return
+            logger.info("In standby: declining challenge %s from %s", challenge_id, challenger)
+            return "standby"
         
         if challenger.lower() == self.username.lower():
-            return
+            return None
         
-        logger.info(f"Received challenge from {challenger}")
-        logger.info(f"  Variant: {variant}, Rated: {rated}, Speed: {speed}")
+        logger.info("Received challenge from %s", challenger)
+        logger.info("  Variant: %s, Rated: %s, Speed: %s", variant, rated, speed)
         
-        if self.is_playing:
-            logger.info(f"Declining challenge {challenge_id}: Already playing a game")
-            self.client.bots.decline_challenge(challenge_id, reason="later")
-            return
+        # Our own challenges in flight are waiting for the same slots, and canceling one may lose
+        # the race against its acceptance
+        if self.open_slots - len(self.scheduler.pending_ids()) <= 0:
+            logger.info("Declining challenge %s: No free game slots", challenge_id)
+            return "later"
         
         if rated:
-            logger.info(f"Declining challenge {challenge_id}: Only accepting casual games")
-            self.client.bots.decline_challenge(challenge_id, reason="casual")
-            return
+            logger.info("Declining challenge %s: Only accepting casual games", challenge_id)
+            return "casual"
             
-        allowed_variants = ['standard', 'chess960']
-        if variant not in allowed_variants:
-            logger.info(f"Declining challenge {challenge_id}: Only accepting standard and chess960 variants")
-            self.client.bots.decline_challenge(challenge_id, reason="standard")
-            return
+        if variant not in ALLOWED_VARIANTS:
+            logger.info("Declining challenge %s: Only accepting standard and chess960 variants", challenge_id)
+            return "standard"
         
-        logger.info(f"Accepting challenge {challenge_id}")
+        logger.info("Accepting challenge %s", challenge_id)
+        # The challenge becomes a game with the same id; hold its slot so our own challenges
+        # cannot fill it first, and let the challenger withdraw the ones that no longer fit
+        self._reserve_slot(challenge_id)
+        self.wakeup.set('challenge accepted')
+        return ACCEPT
+
+    def _record_challenge_outcome(self, event: dict):
+        """Feed a decline or cancellation of one of our outgoing challenges to the scheduler."""
+        challenge = event['challenge']
+        if event['type'] == 'challengeDeclined':
+            self.scheduler.record_declined(challenge['id'], challenge.get('declineReasonKey'))
+        else:
+            self.scheduler.record_canceled(challenge['id'])
+        self.wakeup.set(event['type'])
+
+    def _handle_challenge(self, challenge: dict):
+        challenge_id = challenge['id']
+        decision = self._review_challenge(challenge)
+        if decision is None:
+            return
         try:
-            self.client.bots.accept_challenge(challenge_id)
+            if decision == ACCEPT:
+                self.client.bots.accept_challenge(challenge_id)
+            else:
+                self.client.bots.decline_challenge(challenge_id, reason=decision)
         except Exception as e:
-            logger.error(f"Failed to accept challenge: {e}")
+            self._answer_failed(challenge_id, decision, e)
+
+    def _answer_failed(self, challenge_id: str, decision: str, error: Exception):
+        logger.error("Failed to %s challenge: %s", 'accept' if decision == ACCEPT else 'decline', error)
+        self._unreserve_slot(challenge_id)
 
     def _play_game(self, game_id: str):
-        logger.info(f"Playing game: {game_id}")
-        board = chess.Board()
-        is_white = True
-        initial_fen = None
-        is_chess960 = False
+        current_game.set(game_id)
+        logger.info("Playing game: %s", game_id)
+        session = None
+        engine = None
         
         try:
-            for event in self.client.bots.stream_game_state(game_id):
-                if event['type'] == 'gameFull':
-                    white_player = event['white']
-                    white_name = white_player.get('name') or white_player.get('id', 'Anonymous')
-                    black_player = event['black']
-                    black_name = black_player.get('name') or black_player.get('id', 'Anonymous')
-                    variant = event.get('variant', {}).get('key', 'standard')
-                    is_chess960 = variant == 'chess960'
-                    initial_fen = event.get('initialFen', chess.STARTING_FEN)
-                    if initial_fen == 'startpos':
-                        initial_fen = chess.STARTING_FEN
-                    
-                    logger.info(f"Game: {white_name} vs {black_name} ({variant})")
-                    
-                    is_white = str(white_name).lower() == self.username.lower()
-                    
-                    moves = event['state'].get('moves', '')
-                    board = chess.Board(initial_fen, chess960=is_chess960)
-                    if moves:
-                        for move in moves.split():
-                            board.push_uci(move)
-                    
-                    if self._is_my_turn(board, is_white):
-                        self._make_move(game_id, board)
-                        
-                elif event['type'] == 'gameState':
-                    status = event.get('status')
-                    if status in ['mate', 'resign', 'stalemate', 'timeout', 'draw', 'outoftime', 'aborted']:
-                        logger.info(f"Game {game_id} ended: {status}")
-                        self.is_playing = False
-                        return
-                    
-                    moves = event.get('moves', '')
-                    board = chess.Board(initial_fen if initial_fen else chess.STARTING_FEN, chess960=is_chess960)
-                    if moves:
-                        for move in moves.split():
-                            board.push_uci(move)
-                    
-                    if not board.is_game_over() and self._is_my_turn(board, is_white):
-                        self._make_move(game_id, board)
-                            
-                elif event['type'] == 'chatLine':
-                    pass
-                    
+            if self.engine_pool is None:
+                logger.error("Engine not initialized")
+                return
+            engine = self.engine_pool.lease(game_id)
+            stamps = LineStamps()
+            events = ResilientStream(
+                f"game {game_id}",
+                lambda: self._stream_game_state(game_id, stamps),
+                lambda: self.running,
+                self.stream_stats,
+                max_gap=GAME_STREAM_MAX_GAP,
+                is_final=final_status,
+                gone_statuses=GONE_STATUSES
+            )
+            for event in events:
+                session, step = self._on_game_event(game_id, event, session,
+                                                    MoveTrace(stamps.received, stamps.decoded))
+                if step == GAME_OVER:
+                    return
+                if step == MY_TURN:
+                    self._make_move(game_id, session, engine)
+
+        except StreamGone as e:
+            self._game_gone(game_id, e)
         except Exception as e:
-            logger.error(f"Error in game {game_id}: {e}")
+            logger.error("Error in game %s: %s", game_id, e)
         finally:
-            self.is_playing = False
+            if engine is not None and self.engine_pool is not None:
+                self.engine_pool.release(engine)
+            self._game_closed(game_id)
 
-    def _is_my_turn(self, board: chess.Board, is_white: bool) -> bool:
-        return (board.turn == chess.WHITE and is_white) or (board.turn == chess.BLACK and not is_white)
+    def _on_game_event(self, game_id: str, event: dict, session: GameSession | None,
+                       trace: MoveTrace) -> tuple[GameSession | None, str | None]:
+        """
+        Apply one game stream event; the game loops of both runtimes are built on this and only
+        add the stream, engine and API calls. Returns the session (created by the first event)
+        and GAME_OVER, MY_TURN or None.
+        """
+        if event['type'] == 'gameFull':
+            session = self._sync_game_full(game_id, event, session)
+            status = final_status(event)
+        elif event['type'] == 'gameState':
+            status = final_status(event)
+            if not status:
+                if session is None:
+                    session = GameSession(game_id)
+                session.sync(event.get('moves', ''))
+                session.clock.update(event)
+        else:
+            # chatLine and opponentGone: nothing to play on
+            return session, None
+        if status:
+            self._game_ended(game_id, status, session)
+            return session, GAME_OVER
+        trace.synced = time.monotonic()
+        session.trace = trace
+        if not session.board.is_game_over() and self._is_my_turn(session):
+            return session, MY_TURN
+        return session, None
 
-    def _make_move(self, game_id: str, board: chess.Board):
-        if board.is_game_over():
-            return
-        
-        if self.engine is None:
-            logger.error("Engine not initialized")
-            return
+    def _game_gone(self, game_id: str, error: StreamGone):
+        logger.warning("Game %s no longer exists, freeing its slot: %s", game_id, error)
+
+    def _game_closed(self, game_id: str):
+        """Bookkeeping when a game loop exits for any reason, once its engine is back in the pool."""
+        self.scheduler.record_game_end(game_id, None)
+        self.latency.end_game(game_id)
+        if self.recorder is not None:
+            self.recorder.close(game_stream(game_id))
+        self._release_slot(game_id)
+
+    def _sync_game_full(self, game_id: str, event: dict, session: GameSession | None) -> GameSession:
+        """
+        Set up the game from a gameFull event. A game stream that reconnects starts
+        with a fresh gameFull; the existing session is then resynced, not replaced.
+        """
+        white_player = event['white']
+        white_name = white_player.get('name') or white_player.get('id', 'Anonymous')
+        black_player = event['black']
+        black_name = black_player.get('name') or black_player.get('id', 'Anonymous')
+        is_white = str(white_name).lower() == self.username.lower()
+
+        if session is None:
+            variant = event.get('variant', {}).get('key', 'standard')
+            is_chess960 = variant == 'chess960'
+            initial_fen = event.get('initialFen', chess.STARTING_FEN)
+            if initial_fen == 'startpos':
+                initial_fen = chess.STARTING_FEN
             
+            logger.info("Game: %s vs %s (%s)", white_name, black_name, variant)
+            session = GameSession(game_id, initial_fen, chess960=is_chess960)
+        else:
+            logger.info("Game %s: resyncing from gameFull", game_id)
+
+        session.is_white = is_white
+        session.sync(event['state'].get('moves', ''))
+        session.clock.update(event['state'])
+        return session
+
+    def _game_ended(self, game_id: str, status: str, session: GameSession | None):
+        logger.info("Game %s ended: %s", game_id, status)
+        self.scheduler.record_game_end(game_id, status)
+        self.games_finished.inc(status=status)
+        if session is not None:
+            self._log_game_summary(session)
+
+    def _is_my_turn(self, session: GameSession) -> bool:
+        return session.board.turn == (chess.WHITE if session.is_white else chess.BLACK)
+
+    def _make_move(self, game_id: str, session: GameSession, engine: chess.engine.SimpleEngine):
+        if not self._move_due(game_id, session):
+            return
         try:
-            result = self.engine.play(
-                board,
-                chess.engine.Limit(depth=STOCKFISH_DEPTH)
-            )
-            move = result.move
-            
+            source, move = self._lookup_move(session)
             if move is None:
-                logger.error("Engine returned no move")
-                return
-            
-            logger.info(f"Playing move: {move.uci()}")
-            self.client.bots.make_move(game_id, move.uci())
-            
+                move = self._engine_move(game_id, session, engine)
+            if self._ready_to_post(session, move):
+                self._post_move(game_id, move)
+                self._record_move(session, source)
         except Exception as e:
-            logger.error(f"Failed to make move: {e}")
+            logger.error("Failed to make move: %s", e)
+
+    def _engine_move(self, game_id: str, session: GameSession,
+                     engine: chess.engine.SimpleEngine) -> chess.Move | None:
+        bucket, limit = self._start_search(session)
+        result = engine.play(session.board, limit, game=game_id, ponder=PONDER)
+        return self._finish_search(session, bucket, result)
 
-    def _get_online_bots(self) -> list:
-        """Fetch list of online bots from Lichess API."""
+    def _post_move(self, game_id: str, move: chess.Move):
         try:
-            url = "https://lichess.org/api/bot/online"
-            headers = {
-                "Authorization": f"Bearer {self.api_token}",
-                "Accept": "application/x-ndjson"
-            }
-            response = requests.get(url, headers=headers, stream=True, timeout=30)
+            self.client.bots.make_move(game_id, move.uci())
+        except berserk.exceptions.ResponseError as e:
+            if not self._retry_move(game_id, e.status_code):
+                raise
+            self.client.bots.make_move(game_id, move.uci())
+
+    def _retry_move(self, game_id: str, status: int | None) -> bool:
+        """Whether a move POST that failed with this HTTP status is posted once more."""
+        if status != 429:
+            return False
+        # The governor holds the retry until the mandated pause is over
+        logger.warning("Move in game %s was rate limited; retrying after the pause", game_id)
+        return True
+
+    def _move_due(self, game_id: str, session: GameSession) -> bool:
+        """Whether the position still needs an answer; notes the opponent's move and our ply if so."""
+        board = session.board
+        if board.is_game_over():
+            return False
+        if session.submitted_moves == session.moves:
+            # Already answered this position (e.g. resync after a reconnect)
+            return False
+        if session.moves:
+            self.scheduler.record_opponent_move(game_id)
+        current_ply.set(board.ply() + 1)
+        return True
+
+    def _lookup_move(self, session: GameSession) -> tuple[str, chess.Move | None]:
+        """Book or tablebase move with its source, or ('engine', None) when the engine has to search."""
+        move = self._book_move(session)
+        if move is not None:
+            return 'book', move
+        move = self._tablebase_move(session)
+        if move is not None:
+            return 'tablebase', move
+        return 'engine', None
+
+    def _book_move(self, session: GameSession) -> chess.Move | None:
+        if not self.book.enabled:
+            return None
+        move = self.book.choose(session.board, session.variant)
+        if move is not None:
+            session.book_hits += 1
+            # The engine is not searching, so there is no ponder move to hit
+            session.ponder_move = None
+        return move
+
+    def _tablebase_move(self, session: GameSession) -> chess.Move | None:
+        if not self.tablebase.enabled:
+            return None
+        move = self.tablebase.probe_move(session.board)
+        if move is not None:
+            session.tablebase_hits += 1
+            session.ponder_move = None
+        return move
+
+    def _start_search(self, session: GameSession) -> tuple[str, chess.engine.Limit]:
+        """Ponder bucket and time limit for the search about to start; stamps its start on the trace."""
+        bucket = ponder.classify(session.board, session.ponder_move)
+        if bucket == ponder.HIT:
+            session.ponder_hits += 1
+        elif bucket == ponder.MISS:
+            session.ponder_misses += 1
+        session.trace.engine_start = time.monotonic()
+        return bucket, self.time_manager.limit(session.clock, session.board.turn)
+
+    def _finish_search(self, session: GameSession, bucket: str,
+                       result: chess.engine.PlayResult) -> chess.Move | None:
+        trace = session.trace
+        trace.engine_end = time.monotonic()
+        elapsed = trace.engine_end - trace.engine_start
+        self.ponder_stats.record(bucket, elapsed)
+        self.think_time.observe(elapsed)
+        session.ponder_move = result.ponder if PONDER else None
+        return result.move
+
+    def _ready_to_post(self, session: GameSession, move: chess.Move | None) -> bool:
+        if move is None:
+            logger.error("Engine returned no move")
+            return False
+        logger.info("Playing move: %s", move)
+        session.trace.post_start = time.monotonic()
+        return True
+
+    def _record_move(self, session: GameSession, source: str):
+        session.submitted_moves = session.moves
+        trace = session.trace
+        trace.post_end = time.monotonic()
+        self.moves_played.inc(source=source)
+        self.move_post_latency.observe(trace.post_end - trace.post_start)
+        self.event_to_move.observe(trace.post_end - trace.received)
+        # Our move is not on the board until the next event, so it is the ply after the last one
+        self.latency.record(session.game_id, session.board.ply() + 1, source, trace)
+
+    def _log_game_summary(self, session: GameSession):
+        if self.book.enabled:
+            logger.info("Game %s book moves: %s", session.game_id, session.book_hits)
+        if self.tablebase.enabled:
+            logger.info("Game %s tablebase moves: %s", session.game_id, session.tablebase_hits)
+        if PONDER:
+            logger.info("Game %s ponder hits: %s/%s", session.game_id, session.ponder_hits,
+                        session.ponder_hits + session.ponder_misses)
+
+    def _get_online_bots(self, limit: int | None = None) -> Iterator[dict]:
+        """Stream online bots from the Lichess API, decoding one NDJSON line at a time."""
+        url = f"{LICHESS_URL}/api/bot/online"
+        headers = {"Accept": "application/x-ndjson"}
+        with self.session.get(url, headers=headers, params={"nb": limit}, stream=True) as response:
             response.raise_for_status()
-            
-            bots = []
-            for line in response.iter_lines():
-                if line:
-                    bot = json.loads(line.decode('utf-8'))
-                    bots.append(bot)
-            return bots
+            yield from parse_lines(response.iter_lines())
+
+    def _stream_lines(self, path: str) -> Iterator[bytes]:
+        """Raw NDJSON lines of a Lichess stream, copied to the capture when recording."""
+        headers = {"Accept": "application/x-ndjson"}
+        with self.session.get(f"{LICHESS_URL}{path}", headers=headers, stream=True) as response:
+            response.raise_for_status()
+            lines = response.iter_lines()
+            if self.recorder is not None:
+                lines = self.recorder.tee(stream_name(path), lines)
+            yield from lines
+
+    def _stream_tee(self, path: str):
+        """Line callback for AsyncLichessClient.stream that feeds the capture, None when not recording."""
+        if self.recorder is None:
+            return None
+        name = stream_name(path)
+        return lambda line: self.recorder.write(name, line)
+
+    def _stream_game_state(self, game_id: str, stamps: LineStamps) -> Iterator[dict]:
+        """Game stream events, noting on stamps when each line arrived and was decoded."""
+        return decode_lines(self._stream_lines(f"/api/bot/game/stream/{game_id}"), stamps)
+
+    def _excluded_ids(self) -> set[str]:
+        """Bots not to challenge now: ourselves, the blocklist, and bots on a scheduler cooldown."""
+        return CHALLENGE_BLOCKLIST | self.scheduler.unavailable() | {self.username.lower()}
+
+    def _pick_from_roster(self, roster: Roster) -> dict | None:
+        exclude = self._excluded_ids()
+        candidates = roster.candidates(CHALLENGE_PERF, CHALLENGE_MIN_RATING, CHALLENGE_MAX_RATING,
+                                       CHALLENGE_CANDIDATES, exclude=exclude)
+        if not candidates:
+            # The random draw may have hit only excluded bots; scan the band for any other
+            return roster.pick(CHALLENGE_PERF, CHALLENGE_MIN_RATING, CHALLENGE_MAX_RATING, exclude=exclude)
+        return self.scheduler.choose(candidates)
+
+    def _pick_opponent(self) -> dict | None:
+        """Opponent rated in the challenge band for CHALLENGE_PERF, from the cached roster if fresh."""
+        roster = self.roster.current()
+        if roster is not None:
+            return self._pick_from_roster(roster)
+        try:
+            # No roster yet (or it went stale): sample a short list and stop at the first few matches
+            return sample_opponent(self.client.bots.get_online_bots(limit=ROSTER_SAMPLE_LIMIT),
+                                   CHALLENGE_PERF, CHALLENGE_MIN_RATING, CHALLENGE_MAX_RATING,
+                                   exclude=self._excluded_ids())
         except Exception as e:
-            logger.error(f"Failed to fetch online bots: {e}")
-            return []
+            logger.error("Failed to fetch online bots: %s", e, extra=THROTTLE)
+            return None
 
     def _challenger_loop(self):
         """Background thread that challenges other bots."""
         time.sleep(5)
-        logger.info(f"Bot challenger: Looking for bots rated {CHALLENGE_MAX_RATING} or less")
-        logger.info(f"Bot challenger: Will send 3+0 casual challenges every {CHALLENGE_INTERVAL} seconds")
-        
+        self._log_challenger_settings()
         while self.challenger_running:
-            # stop challenger loop if standby engaged
-            if getattr(self, 'standby', False):
-                logger.info("Standby engaged: stopping challenger loop")
-                break
             try:
-                if self.is_playing:
-                    time.sleep(10)
-                    continue
-                
-                bots = self._get_online_bots()
-                
-                eligible_bots = []
-                for bot in bots:
-                    if bot.get('id', '').lower() == self.username.lower():
-                        continue
-                    
-                    perfs = bot.get('perfs', {})
-                    blitz_rating = perfs.get('blitz', {}).get('rating', 1500)
-                    
-                    if blitz_rating <= CHALLENGE_MAX_RATING:
-                        eligible_bots.append({
-                            'username': bot.get('username') or bot.get('id'),
-                            'rating': blitz_rating
-                        })
-                
-                if eligible_bots and not self.is_playing:
-                    target = random.choice(eligible_bots)
-                    logger.info(f"Challenging bot: {target['username']} (rating: {target['rating']})")
-                    self.send_challenge(
-                        target['username'],
-                        clock_limit=60,
-                        clock_increment=0,
-                        variant='standard'
-                    )
-                elif not eligible_bots:
-                    logger.info("No eligible bots found online")
-                
+                self._run_pipeline()
             except Exception as e:
-                logger.error(f"Error in challenger loop: {e}")
-            
-            time.sleep(CHALLENGE_INTERVAL)
+                logger.error("Error in challenger loop: %s", e)
+            if self._challenger_stopped():
+                break
+            self.wakeup.wait(self._challenger_timeout())
+
+    def _log_challenger_settings(self):
+        logger.info(f"Bot challenger: Looking for bots rated {CHALLENGE_MAX_RATING} or less in {CHALLENGE_PERF}")
+        logger.info(f"Bot challenger: Will send {CHALLENGE_CLOCK_LIMIT // 60}+{CHALLENGE_CLOCK_INCREMENT} "
+                    f"casual challenges whenever a slot is free")
+        logger.info(f"Bot challenger: Filling up to {self.max_games} concurrent game slots")
+
+    def _challenger_stopped(self) -> bool:
+        # stop challenger loop if standby engaged (the pipeline has withdrawn every challenge)
+        if getattr(self, 'standby', False):
+            logger.info("Standby engaged: stopping challenger loop")
+            return True
+        return False
+
+    def _pipeline_plan(self) -> tuple[list[tuple[str, bool]], int]:
+        """
+        Challenges to cancel, as (id, timed out) pairs, and how many new ones to send so that
+        the number in flight matches the pipeline target for the open slots. Timed-out
+        challenges were already dropped by the scheduler; extras are withdrawn at cancel time.
+        While an accepted incoming challenge waits for its game, no more are kept in flight
+        than there are open slots, so an acceptance of ours cannot take the reserved one.
+        """
+        target = self._pipeline_target()
+        to_cancel = [(challenge_id, True) for challenge_id in self.scheduler.take_expired()]
+        pending = self.scheduler.pending_ids()
+        # Keep the oldest ones, they are the most likely to be answered soon
+        to_cancel += [(challenge_id, False) for challenge_id in pending[target:]]
+        return to_cancel, max(0, target - len(pending))
 
-    def send_challenge(self, username: str, clock_limit: int = 300, clock_increment: int = 3, variant: str = 'standard'):
+    def _pipeline_target(self) -> int:
+        open_slots = self.open_slots
+        target = 0 if self.standby else self.scheduler.pipeline_target(open_slots)
+        with self._slots_lock:
+            reserved = bool(self._reserved)
+        if reserved:
+            target = min(target, max(0, open_slots))
+        return target
+
+    def _may_send(self) -> bool:
+        """
+        Checked right before each new challenge, like _may_cancel: while the send waited for the
+        challenge bucket, games may have started or an incoming challenge taken the slot it was for.
+        """
+        return len(self.scheduler.pending_ids()) < self._pipeline_target()
+
+    def _may_cancel(self, challenge_id: str, expired: bool) -> bool:
+        """
+        Checked when the cancel call can go out, which may be seconds after the plan when the
+        challenge bucket is empty. A challenge that was accepted in the meantime is a game, and
+        canceling it would abort that game.
         """
-        Send a casual challenge to a user.
+        if self._is_active(challenge_id):
+            return False
+        return expired or self.scheduler.record_withdrawn(challenge_id)
+
+    def _run_pipeline(self):
+        to_cancel, to_send = self._pipeline_plan()
+        for challenge_id, expired in to_cancel:
+            time.sleep(self.governor.ready_in(CHALLENGE))
+            if self._may_cancel(challenge_id, expired):
+                self.cancel_challenge(challenge_id)
+        for _ in range(to_send):
+            time.sleep(self.governor.ready_in(CHALLENGE))
+            if not self._may_send():
+                return
+            target = self._pick_opponent()
+            if not self._will_challenge(target):
+                return
+            challenge_id = self.send_challenge(
+                target['username'],
+                clock_limit=CHALLENGE_CLOCK_LIMIT,
+                clock_increment=CHALLENGE_CLOCK_INCREMENT,
+                variant='standard'
+            )
+            if not challenge_id:
+                return
+            self.scheduler.record_sent(challenge_id, target['username'])
+
+    def _will_challenge(self, target: dict | None) -> bool:
+        if not target:
+            logger.info("No eligible bots found online", extra=THROTTLE)
+            return False
+        logger.info("Challenging bot: %s (rating: %s)", target['username'], target['rating'])
+        return True
+
+    def _challenger_timeout(self) -> float:
+        """How long the challenger may sleep if nothing wakes it."""
+        if self.open_slots <= 0:
+            return CHALLENGE_IDLE_WAIT
+        # With challenges out, their answers (or expiry) are what the challenger waits for
+        expiry = self.scheduler.next_expiry()
+        return CHALLENGE_INTERVAL if expiry is None else min(CHALLENGE_INTERVAL, expiry)
+
+    def send_challenge(self, username: str, clock_limit: int = 300, clock_increment: int = 3,
+                       variant: str = 'standard') -> str | None:
+        """
+        Send a casual challenge to a user and return its id (None if it could not be sent).
         clock_limit: Initial time in seconds (default 5 minutes)
         clock_increment: Increment in seconds (default 3)
         variant: 'standard' or 'chess960' (default 'standard')
         """
-        allowed_variants = ['standard', 'chess960']
-        if variant not in allowed_variants:
-            logger.error(f"Invalid variant '{variant}'. Only {allowed_variants} are supported.")
-            return
+        if variant not in ALLOWED_VARIANTS:
+            logger.error("Invalid variant '%s'. Only %s are supported.", variant, ALLOWED_VARIANTS)
+            return None
             
         try:
-            logger.info(f"Sending casual {variant} challenge to {username}")
-            self.client.challenges.create(
+            logger.info("Sending casual %s challenge to %s", variant, username)
+            response = self.client.challenges.create(
                 username,
                 rated=False,
                 clock_limit=clock_limit,
                 clock_increment=clock_increment,
                 variant=variant
             )
-            logger.info(f"Challenge sent to {username}")
+            logger.info("Challenge sent to %s", username)
+            return self._challenge_id(response)
+        except Exception as e:
+            logger.error("Failed to send challenge: %s", e)
+            return None
+
+    def cancel_challenge(self, challenge_id: str):
+        """Withdraw an outgoing challenge (this aborts the game if it was accepted in the meantime)."""
+        try:
+            self.client.challenges.cancel(challenge_id)
+            logger.info("Canceled challenge %s", challenge_id)
         except Exception as e:
-            logger.error(f"Failed to send challenge: {e}")
+            logger.warning("Failed to cancel challenge %s: %s", challenge_id, e)
+
+    @staticmethod
+    def _challenge_id(response) -> str | None:
+        """Id from a create-challenge response; older API versions nest it under 'challenge'."""
+        if not isinstance(response, dict):
+            return None
+        return response.get('id') or response.get('challenge', {}).get('id')
+
+    def _stop_capture(self):
+        """Stop the profilers and the stream recorder; the first step of every shutdown."""
+        # The profiler threads sample the bot's own threads; stop them before those wind down
+        self.profiler.close()
+        if self.shift_profiler is not None:
+            self.shift_profiler.close()
+        if self.recorder is not None:
+            self.recorder.close_all()
+
+    def _close_and_summarize(self, http):
+        """Close the book and tablebase and log every summary, once the engine pool is closed."""
+        self.book.close()
+        self.tablebase.log_summary()
+        self.tablebase.close()
+        self.ponder_stats.log_summary()
+        self.scheduler.log_summary()
+        self.idle_gaps.log_summary()
+        self.latency.log_summary()
+        self.governor.log_summary()
+        self.stream_stats.log_summary()
+        http.log_summary()
+        self.drain.log_summary()
 
     def _cleanup(self):
-        if self.engine:
-            logger.info("Closing Stockfish engine...")
-            self.engine.quit()
+        self.roster.stop()
+        self._stop_capture()
+        if self.engine_pool:
+            logger.info("Closing Stockfish engine pool...")
+            self.engine_pool.close()
+        self._close_and_summarize(self.session)
 
 
 def main():
@@ -399,8 +1059,15 @@ def main():
         logger.error("Please set your Lichess API token (prefer repository secret `LICHESS_API_TOKEN`).")
         sys.exit(1)
     
-    bot = LichessBot(api_token)
-    bot.start()
+    if BOT_RUNTIME == 'async':
+        from async_bot import AsyncLichessBot
+        bot = AsyncLichessBot(api_token)
+    else:
+        bot = LichessBot(api_token)
+    if METRICS_PORT:
+        MetricsServer(bot.metrics, METRICS_HOST, METRICS_PORT).start()
+    # 0 when every game was played to the end, otherwise reports the games resigned while draining
+    sys.exit(bot.start())
 
 
 if __name__ == "__main__":
@@ -0,0 +1,562 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the Lichess API, for offline end-to-end runs and load tests.
+
+Implements the endpoints the bot uses: account, the incoming-event stream,
+game streams, move/abort/resign, challenge create/accept/decline/cancel and
+the online-bot list. The opponents are scripted bots. Each one accepts a
+challenge with its own probability after its own answer latency, thinks
+for a set time per move and plays a random legal move. It resigns after a
+set number of plies, or plays on until mate, a draw or a flag. Some of them
+also challenge the bot. Clocks are real: time runs for the side to move
+once both sides have moved, and a side whose time runs out loses on time.
+Every response can be delayed by a fixed latency, and any REST call can be
+answered with a 429 at a configurable rate. GET /standin/stats returns the
+server's own counts (games by end status, flags on either side, moves,
+challenges, 429s) as JSON.
+
+Usage: python DRFizzle-BOT-Lichess/local_lichess.py [--port 8080] [--help for all options]
+Then run the bot with LICHESS_URL=http://127.0.0.1:8080 and any token.
+"""
+
+import re
+import json
+import time
+import random
+import asyncio
+import argparse
+import logging
+from collections import Counter
+from urllib.parse import urlsplit, parse_qs
+import chess
+
+logger = logging.getLogger(__name__)
+
+KEEPALIVE_INTERVAL = 5.0  # Seconds between blank keep-alive lines on idle streams
+CHALLENGE_EXPIRY = 20.0  # Seconds before an unanswered challenge to the bot is withdrawn
+STATUS_TEXT = {200: "OK", 400: "Bad Request", 404: "Not Found", 429: "Too Many Requests"}
+
+
+class Opponent:
+    """A scripted bot: how it answers challenges and how it plays."""
+
+    def __init__(self, name: str, rating: int = 1500, accept: float = 0.8, answer_latency: float = 1.0,
+                 think: float = 0.5, resign_after: int = 0, decline_reason: str = "later"):
+        self.name = name
+        self.id = name.lower()
+        self.rating = rating
+        self.accept = accept
+        self.answer_latency = answer_latency
+        self.think = think
+        # Resign once the game reaches this many plies; 0 plays on to the end
+        self.resign_after = resign_after
+        self.decline_reason = decline_reason
+
+    def profile(self) -> dict:
+        """Entry of /api/bot/online."""
+        perfs = {perf: {"games": 100, "rating": self.rating, "rd": 60, "prog": 0}
+                 for perf in ('bullet', 'blitz', 'rapid', 'classical')}
+        return {"id": self.id, "username": self.name, "title": "BOT", "perfs": perfs}
+
+    def player(self) -> dict:
+        return {"id": self.id, "name": self.name, "title": "BOT", "rating": self.rating}
+
+
+class Game:
+    def __init__(self, game_id: str, opponent: Opponent, bot_player: dict, bot_color: chess.Color,
+                 limit: int, increment: int):
+        self.id = game_id
+        self.opponent = opponent
+        self.bot_player = bot_player
+        self.bot_color = bot_color
+        self.board = chess.Board()
+        self.moves: list[str] = []
+        self.limit_ms = limit * 1000
+        self.increment_ms = increment * 1000
+        self.time_ms = {chess.WHITE: self.limit_ms, chess.BLACK: self.limit_ms}
+        self.turn_started = time.monotonic()
+        self.status = "started"
+        self.winner: chess.Color | None = None
+        self.subscribers: list[asyncio.Queue] = []
+        self.changed = asyncio.Event()
+
+    @property
+    def over(self) -> bool:
+        return self.status != "started"
+
+    @property
+    def clock_running(self) -> bool:
+        return len(self.moves) >= 2 and not self.over
+
+    def remaining_ms(self, color: chess.Color) -> float:
+        spent = 0.0
+        if self.clock_running and self.board.turn == color:
+            spent = (time.monotonic() - self.turn_started) * 1000
+        return self.time_ms[color] - spent
+
+    def state(self) -> dict:
+        state = {
+            "type": "gameState", "moves": " ".join(self.moves),
+            "wtime": int(self.time_ms[chess.WHITE]), "btime": int(self.time_ms[chess.BLACK]),
+            "winc": self.increment_ms, "binc": self.increment_ms, "status": self.status,
+        }
+        if self.winner is not None:
+            state["winner"] = chess.COLOR_NAMES[self.winner]
+        return state
+
+    def full(self) -> dict:
+        white, black = ((self.bot_player, self.opponent.player()) if self.bot_color == chess.WHITE
+                        else (self.opponent.player(), self.bot_player))
+        return {
+            "type": "gameFull", "id": self.id, "rated": False, "speed": "bullet",
+            "variant": {"key": "standard", "name": "Standard", "short": "Std"},
+            "clock": {"initial": self.limit_ms, "increment": self.increment_ms},
+            "white": white, "black": black, "initialFen": "startpos", "state": self.state(),
+        }
+
+    def play(self, uci: str, color: chess.Color) -> str | None:
+        """Apply a move by color; returns an error message if it is not allowed."""
+        if self.over or self.board.turn != color:
+            return "Not your turn, or game already over"
+        try:
+            move = self.board.parse_uci(uci)
+        except ValueError:
+            return f"Illegal move {uci}"
+        now = time.monotonic()
+        if self.clock_running:
+            self.time_ms[color] -= (now - self.turn_started) * 1000
+            if self.time_ms[color] <= 0:
+                self.time_ms[color] = 0
+                self.finish("outoftime", not color)
+                return "Time is up"
+            self.time_ms[color] += self.increment_ms
+        self.board.push(move)
+        self.moves.append(uci)
+        self.turn_started = now
+        if self.board.is_checkmate():
+            self.finish("mate", color)
+        elif self.board.is_stalemate():
+            self.finish("stalemate", None)
+        elif self.board.is_insufficient_material() or self.board.can_claim_draw():
+            self.finish("draw", None)
+        else:
+            self.publish()
+        return None
+
+    def finish(self, status: str, winner: chess.Color | None):
+        if self.over:
+            return
+        if self.clock_running:
+            mover = self.board.turn
+            self.time_ms[mover] = max(0.0, self.remaining_ms(mover))
+        self.status = status
+        self.winner = winner
+        self.publish()
+
+    def publish(self):
+        state = self.state()
+        for queue in self.subscribers:
+            queue.put_nowait(state)
+        self.changed.set()
+
+
+class StandInServer:
+    def __init__(self, opponents: list[Opponent], username: str = "StandInBot", latency: float = 0.0,
+                 rate429: float = 0.0, retry_after: int = 1, incoming_per_minute: float = 0.0,
+                 seed: int | None = None):
+        self.opponents = {opponent.id: opponent for opponent in opponents}
+        self.username = username
+        self.latency = latency
+        self.rate429 = rate429
+        self.retry_after = retry_after
+        self.incoming_per_minute = incoming_per_minute
+        self.rng = random.Random(seed)
+        self.games: dict[str, Game] = {}
+        # Outgoing challenges of the bot: id -> (opponent, clock limit, increment)
+        self.challenges: dict[str, tuple[Opponent, int, int]] = {}
+        # Challenges from opponents to the bot: id -> (opponent, color the bot would play)
+        self.incoming: dict[str, tuple[Opponent, chess.Color]] = {}
+        self.event_subscribers: list[asyncio.Queue] = []
+        self.stats: Counter[str] = Counter()
+        self._ids = 0
+        self._tasks: set[asyncio.Task] = set()
+        self.routes = [
+            ("GET", re.compile(r"/api/account$"), self.account),
+            ("GET", re.compile(r"/api/stream/event$"), self.event_stream),
+            ("GET", re.compile(r"/api/bot/game/stream/(\w+)$"), self.game_stream),
+            ("GET", re.compile(r"/api/bot/online$"), self.online_bots),
+            ("GET", re.compile(r"/standin/stats$"), self.stats_page),
+            ("POST", re.compile(r"/api/bot/game/(\w+)/move/(\w+)$"), self.move),
+            ("POST", re.compile(r"/api/bot/game/(\w+)/resign$"), self.resign),
+            ("POST", re.compile(r"/api/bot/game/(\w+)/abort$"), self.abort),
+            ("POST", re.compile(r"/api/challenge/(\w+)/accept$"), self.accept),
+            ("POST", re.compile(r"/api/challenge/(\w+)/decline$"), self.decline),
+            ("POST", re.compile(r"/api/challenge/(\w+)/cancel$"), self.cancel),
+            ("POST", re.compile(r"/api/challenge/([\w-]+)$"), self.create_challenge),
+        ]
+
+    def _next_id(self) -> str:
+        self._ids += 1
+        return f"s{self._ids:07d}"
+
+    def _spawn(self, coro):
+        task = asyncio.create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    @property
+    def bot_player(self) -> dict:
+        return {"id": self.username.lower(), "name": self.username, "title": "BOT", "rating": 1500}
+
+    def emit(self, event: dict):
+        for queue in self.event_subscribers:
+            queue.put_nowait(event)
+
+    # --- HTTP plumbing ---
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line.strip():
+                    return
+                method, target, _ = request_line.decode('latin-1').split(' ', 2)
+                headers = {}
+                while (line := await reader.readline()) not in (b'\r\n', b'\n', b''):
+                    key, _, value = line.decode('latin-1').partition(':')
+                    headers[key.strip().lower()] = value.strip()
+                length = int(headers.get('content-length', 0))
+                body = await reader.readexactly(length) if length else b''
+                url = urlsplit(target)
+                params = {key: values[-1] for key, values in parse_qs(url.query).items()}
+                if headers.get('content-type', '').startswith('application/json') and body:
+                    params.update(json.loads(body))
+                elif body:
+                    params.update({key: values[-1] for key, values in parse_qs(body.decode()).items()})
+                if not await self.dispatch(method, url.path, params, writer):
+                    return
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def dispatch(self, method: str, path: str, params: dict, writer: asyncio.StreamWriter) -> bool:
+        """Answer one request; returns False if the connection must be closed afterwards."""
+        for route_method, pattern, handler in self.routes:
+            match = pattern.match(path)
+            if route_method == method and match:
+                break
+        else:
+            await self.respond(writer, 404, {"error": "Not found"})
+            return True
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        streaming = handler in (self.event_stream, self.game_stream, self.online_bots)
+        if not streaming and self.rate429 and self.rng.random() < self.rate429:
+            self.stats["rate_limited"] += 1
+            await self.respond(writer, 429, {"error": "Too many requests. Try again later."},
+                               {"Retry-After": str(self.retry_after)})
+            return True
+        result = await handler(writer, params, *match.groups())
+        if streaming:
+            return False
+        status, payload = result
+        await self.respond(writer, status, payload)
+        return True
+
+    async def respond(self, writer: asyncio.StreamWriter, status: int, payload: dict,
+                      headers: dict | None = None):
+        data = json.dumps(payload).encode()
+        head = [f"HTTP/1.1 {status} {STATUS_TEXT.get(status, 'Error')}",
+                "Content-Type: application/json", f"Content-Length: {len(data)}"]
+        head += [f"{key}: {value}" for key, value in (headers or {}).items()]
+        writer.write(("\r\n".join(head) + "\r\n\r\n").encode() + data)
+        await writer.drain()
+
+    async def stream_ndjson(self, writer: asyncio.StreamWriter, queue: asyncio.Queue | None,
+                            initial: list[dict], until=None):
+        """Chunked NDJSON: initial lines, then whatever arrives on queue, with keep-alives."""
+        writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: application/x-ndjson\r\n"
+                     b"Transfer-Encoding: chunked\r\n\r\n")
+
+        def chunk(line: bytes):
+            writer.write(f"{len(line):x}\r\n".encode() + line + b"\r\n")
+
+        for item in initial:
+            chunk(json.dumps(item).encode() + b"\n")
+        await writer.drain()
+        while queue is not None and not (until and until()):
+            try:
+                item = await asyncio.wait_for(queue.get(), KEEPALIVE_INTERVAL)
+                chunk(json.dumps(item).encode() + b"\n")
+            except asyncio.TimeoutError:
+                chunk(b"\n")
+            await writer.drain()
+        writer.write(b"0\r\n\r\n")
+        await writer.drain()
+
+    # --- Endpoints ---
+
+    async def account(self, writer, params):
+        return 200, {"id": self.username.lower(), "username": self.username, "title": "BOT"}
+
+    async def stats_page(self, writer, params):
+        return 200, {
+            "games_started": self.stats["games_started"],
+            "games_finished": {key.split(" ", 1)[1]: count for key, count in self.stats.items()
+                               if key.startswith("finished ")},
+            "bot_flags": self.stats["bot_flags"],
+            "opponent_flags": self.stats["opponent_flags"],
+            "bot_moves": self.stats["bot_moves"],
+            "challenges": {key.split(" ", 1)[1]: count for key, count in self.stats.items()
+                           if key.startswith("challenges ")},
+            "rate_limited": self.stats["rate_limited"],
+            "active_games": sum(1 for game in self.games.values() if not game.over),
+        }
+
+    async def event_stream(self, writer, params):
+        queue = asyncio.Queue()
+        self.event_subscribers.append(queue)
+        # Like Lichess, a new connection is told about every game still running
+        ongoing = [self._game_start_event(game) for game in self.games.values() if not game.over]
+        try:
+            await self.stream_ndjson(writer, queue, ongoing)
+        finally:
+            self.event_subscribers.remove(queue)
+
+    async def game_stream(self, writer, params, game_id):
+        game = self.games.get(game_id)
+        if game is None:
+            await self.respond(writer, 404, {"error": "No such game"})
+            return
+        queue = asyncio.Queue()
+        game.subscribers.append(queue)
+        try:
+            # A finished game sends its final state and closes, as on Lichess
+            await self.stream_ndjson(writer, queue if not game.over else None, [game.full()],
+                                     until=lambda: game.over and queue.empty())
+        finally:
+            game.subscribers.remove(queue)
+
+    async def online_bots(self, writer, params):
+        bots = list(self.opponents.values())
+        if params.get('nb'):
+            bots = bots[:int(params['nb'])]
+        await self.stream_ndjson(writer, None, [bot.profile() for bot in bots])
+
+    async def move(self, writer, params, game_id, uci):
+        game = self.games.get(game_id)
+        if game is None:
+            return 404, {"error": "No such game"}
+        error = game.play(uci, game.bot_color)
+        if error:
+            return 400, {"error": error}
+        self.stats["bot_moves"] += 1
+        return 200, {"ok": True}
+
+    async def resign(self, writer, params, game_id):
+        game = self.games.get(game_id)
+        if game is None or game.over:
+            return 400, {"error": "Game already over"}
+        game.finish("resign", not game.bot_color)
+        return 200, {"ok": True}
+
+    async def abort(self, writer, params, game_id):
+        game = self.games.get(game_id)
+        if game is None or game.over or len(game.moves) >= 2:
+            return 400, {"error": "This game can no longer be aborted"}
+        game.finish("aborted", None)
+        return 200, {"ok": True}
+
+    async def create_challenge(self, writer, params, username):
+        opponent = self.opponents.get(username.lower())
+        if opponent is None:
+            return 400, {"error": f"No such bot: {username}"}
+        challenge_id = self._next_id()
+        limit = int(params.get('clock.limit', 60))
+        increment = int(params.get('clock.increment', 0))
+        self.challenges[challenge_id] = (opponent, limit, increment)
+        self.stats["challenges sent"] += 1
+        self._spawn(self._answer_challenge(challenge_id))
+        return 200, {"id": challenge_id, "url": f"http://localhost/{challenge_id}", "status": "created",
+                     "challenger": self.bot_player, "destUser": opponent.player(),
+                     "variant": {"key": "standard"}, "rated": False, "speed": "bullet"}
+
+    async def cancel(self, writer, params, challenge_id):
+        if self.challenges.pop(challenge_id, None) is not None:
+            self.stats["challenges canceled"] += 1
+            return 200, {"ok": True}
+        # Canceling a challenge that was just accepted aborts the game, as on Lichess
+        game = self.games.get(challenge_id)
+        if game is not None and not game.over and len(game.moves) < 2:
+            game.finish("aborted", None)
+            return 200, {"ok": True}
+        return 404, {"error": "No such challenge"}
+
+    async def accept(self, writer, params, challenge_id):
+        incoming = self.incoming.pop(challenge_id, None)
+        if incoming is None:
+            return 404, {"error": "No such challenge"}
+        opponent, bot_color = incoming
+        self.stats["challenges incoming accepted"] += 1
+        self._start_game(challenge_id, opponent, bot_color, 60, 0)
+        return 200, {"ok": True}
+
+    async def decline(self, writer, params, challenge_id):
+        if self.incoming.pop(challenge_id, None) is None:
+            return 404, {"error": "No such challenge"}
+        self.stats["challenges incoming declined"] += 1
+        return 200, {"ok": True}
+
+    # --- Opponents and games ---
+
+    async def _answer_challenge(self, challenge_id: str):
+        opponent = self.challenges[challenge_id][0]
+        await asyncio.sleep(opponent.answer_latency * self.rng.uniform(0.5, 1.5))
+        entry = self.challenges.pop(challenge_id, None)
+        if entry is None:
+            return
+        _, limit, increment = entry
+        if self.rng.random() < opponent.accept:
+            self.stats["challenges accepted"] += 1
+            self._start_game(challenge_id, opponent, self.rng.choice(chess.COLORS), limit, increment)
+        else:
+            self.stats["challenges declined"] += 1
+            self.emit({"type": "challengeDeclined", "challenge": {
+                "id": challenge_id, "challenger": self.bot_player, "destUser": opponent.player(),
+                "declineReason": opponent.decline_reason, "declineReasonKey": opponent.decline_reason,
+            }})
+
+    def _game_start_event(self, game: Game) -> dict:
+        return {"type": "gameStart", "game": {
+            "id": game.id, "gameId": game.id, "fullId": game.id + "0000",
+            "color": chess.COLOR_NAMES[game.bot_color], "isMyTurn": game.board.turn == game.bot_color,
+            "opponent": {"id": game.opponent.id, "username": game.opponent.name, "rating": game.opponent.rating},
+            "variant": {"key": "standard"}, "speed": "bullet", "rated": False, "source": "friend",
+        }}
+
+    def _start_game(self, game_id: str, opponent: Opponent, bot_color: chess.Color, limit: int, increment: int):
+        game = Game(game_id, opponent, self.bot_player, bot_color, limit, increment)
+        self.games[game_id] = game
+        self.stats["games_started"] += 1
+        self.emit(self._game_start_event(game))
+        self._spawn(self._run_opponent(game))
+        self._spawn(self._watch_clock(game))
+
+    async def _run_opponent(self, game: Game):
+        color = not game.bot_color
+        while not game.over:
+            if game.board.turn != color:
+                game.changed.clear()
+                await game.changed.wait()
+                continue
+            think = game.opponent.think * self.rng.uniform(0.5, 1.5)
+            await asyncio.sleep(min(think, max(0.0, game.remaining_ms(color) / 1000 - 0.05)))
+            if game.over:
+                break
+            if game.opponent.resign_after and len(game.moves) >= game.opponent.resign_after:
+                game.finish("resign", game.bot_color)
+                break
+            game.play(self.rng.choice(list(game.board.legal_moves)).uci(), color)
+        self._game_over(game)
+
+    async def _watch_clock(self, game: Game):
+        while not game.over:
+            game.changed.clear()
+            timeout = game.remaining_ms(game.board.turn) / 1000 if game.clock_running else None
+            try:
+                await asyncio.wait_for(game.changed.wait(), timeout)
+            except asyncio.TimeoutError:
+                if game.clock_running and game.remaining_ms(game.board.turn) <= 0:
+                    game.finish("outoftime", not game.board.turn)
+
+    def _game_over(self, game: Game):
+        self.stats[f"finished {game.status}"] += 1
+        if game.status == "outoftime":
+            self.stats["bot_flags" if game.winner != game.bot_color else "opponent_flags"] += 1
+        self.emit({"type": "gameFinish", "game": {"id": game.id, "gameId": game.id,
+                                                  "status": {"name": game.status}}})
+
+    async def _challenge_bot(self):
+        """Opponents challenge the bot at random, at incoming_per_minute on average."""
+        while True:
+            await asyncio.sleep(self.rng.expovariate(self.incoming_per_minute / 60))
+            opponent = self.rng.choice(list(self.opponents.values()))
+            challenge_id = self._next_id()
+            bot_color = self.rng.choice(chess.COLORS)
+            self.incoming[challenge_id] = (opponent, bot_color)
+            self.stats["challenges incoming"] += 1
+            self.emit({"type": "challenge", "challenge": {
+                "id": challenge_id, "status": "created", "challenger": opponent.player(),
+                "destUser": self.bot_player, "variant": {"key": "standard", "name": "Standard"},
+                "rated": False, "speed": "bullet", "timeControl": {"type": "clock", "limit": 60, "increment": 0},
+                "color": chess.COLOR_NAMES[not bot_color],
+            }})
+            self._spawn(self._expire_incoming(challenge_id))
+
+    async def _expire_incoming(self, challenge_id: str):
+        await asyncio.sleep(CHALLENGE_EXPIRY)
+        if self.incoming.pop(challenge_id, None) is not None:
+            self.stats["challenges incoming expired"] += 1
+            self.emit({"type": "challengeCanceled", "challenge": {"id": challenge_id}})
+
+    async def serve(self, host: str, port: int):
+        server = await asyncio.start_server(self.handle, host, port)
+        if self.incoming_per_minute > 0:
+            self._spawn(self._challenge_bot())
+        logger.info(f"Stand-in Lichess on http://{host}:{port} with {len(self.opponents)} opponent(s)")
+        async with server:
+            await server.serve_forever()
+
+
+def scripted_opponents(count: int, accept: float, answer_latency: float, think: float,
+                       resign_after: int, seed: int | None = None) -> list[Opponent]:
+    """count opponents spread around the given averages, rated 800-2000."""
+    rng = random.Random(seed)
+    return [
+        Opponent(f"StandIn{i:03d}", rating=rng.randrange(800, 2000),
+                 accept=min(1.0, max(0.0, rng.gauss(accept, 0.1))),
+                 answer_latency=answer_latency * rng.uniform(0.5, 1.5),
+                 think=think * rng.uniform(0.5, 1.5), resign_after=resign_after)
+        for i in range(count)
+    ]
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Local stand-in Lichess server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--username", default="StandInBot", help="account name of the bot")
+    parser.add_argument("--opponents", type=int, default=50, help="number of scripted opponents")
+    parser.add_argument("--script", help="JSON list of opponents (Opponent keyword arguments) instead")
+    parser.add_argument("--accept", type=float, default=0.8, help="average acceptance probability")
+    parser.add_argument("--answer-latency", type=float, default=1.0, help="average seconds to answer")
+    parser.add_argument("--think", type=float, default=0.5, help="average opponent seconds per move")
+    parser.add_argument("--resign-after", type=int, default=0, help="opponents resign at this ply (0: never)")
+    parser.add_argument("--incoming", type=float, default=0.0, help="challenges to the bot per minute")
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every response")
+    parser.add_argument("--rate429", type=float, default=0.0, help="share of REST calls answered with 429")
+    parser.add_argument("--retry-after", type=int, default=1, help="Retry-After seconds of injected 429s")
+    parser.add_argument("--seed", type=int)
+    return parser.parse_args(argv)
+
+
+def main(argv: list[str] | None = None):
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    args = parse_args(argv)
+    if args.script:
+        with open(args.script, encoding='utf-8') as f:
+            opponents = [Opponent(**entry) for entry in json.load(f)]
+    else:
+        opponents = scripted_opponents(args.opponents, args.accept, args.answer_latency, args.think,
+                                       args.resign_after, args.seed)
+    server = StandInServer(opponents, args.username, args.latency, args.rate429, args.retry_after,
+                           args.incoming, args.seed)
+    try:
+        asyncio.run(server.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
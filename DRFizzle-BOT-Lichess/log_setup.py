@@ -0,0 +1,140 @@
+"""
+Logging setup for the bot: synchronous text (the default) or queue-backed.
+
+In queue mode, game threads and coroutines only put the record on an
+in-memory queue. A background QueueListener formats it and writes it to
+stderr, so a slow log sink never sits in the move path. Messages logged
+with %-style arguments are formatted on the listener thread, never by the
+caller. Either mode can emit JSON lines instead of text; records then carry
+the game id and ply of the game that logged them. Messages marked with
+THROTTLE are logged at most once per interval, with a count of the repeats
+that were dropped.
+"""
+
+import sys
+import json
+import time
+import queue
+import atexit
+import logging
+import logging.handlers
+import threading
+from contextvars import ContextVar
+
+TEXT_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+THROTTLE_INTERVAL = 60.0  # Seconds a throttled message stays quiet after it was logged
+
+# Pass as extra= on messages that may repeat every few seconds (e.g. "no eligible bots")
+THROTTLE = {'throttle': True}
+
+# Game the current thread or task is playing, and the ply of the move it is working on
+current_game: ContextVar[str | None] = ContextVar('current_game', default=None)
+current_ply: ContextVar[int | None] = ContextVar('current_ply', default=None)
+
+
+class GameContextFilter(logging.Filter):
+    """Stamp records with the game id and ply from the calling thread or task."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.game_id = current_game.get()
+        record.ply = current_ply.get()
+        return True
+
+
+class ThrottleFilter(logging.Filter):
+    """Drop repeats of THROTTLE-marked messages within the interval; the next one notes how many were dropped."""
+
+    def __init__(self, interval: float = THROTTLE_INTERVAL):
+        super().__init__()
+        self.interval = interval
+        self._lock = threading.Lock()
+        # Message template -> (time last logged, repeats dropped since)
+        self._seen: dict[str, tuple[float, int]] = {}
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if not getattr(record, 'throttle', False):
+            return True
+        key = str(record.msg)
+        now = time.monotonic()
+        with self._lock:
+            logged_at, dropped = self._seen.get(key, (float('-inf'), 0))
+            if now - logged_at < self.interval:
+                self._seen[key] = (logged_at, dropped + 1)
+                return False
+            self._seen[key] = (now, 0)
+        if dropped:
+            record.msg = f"{record.msg} ({dropped} similar message(s) suppressed)"
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'ts': round(record.created, 3),
+            'level': record.levelname,
+            'logger': record.name,
+            'msg': record.getMessage(),
+        }
+        if getattr(record, 'game_id', None):
+            entry['game_id'] = record.game_id
+        if getattr(record, 'ply', None) is not None:
+            entry['ply'] = record.ply
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry['exc'] = record.exc_text
+        return json.dumps(entry)
+
+
+class DeferredQueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler that leaves formatting to the listener. The stock prepare() renders
+    the message in the caller; the bot only passes immutable arguments, so the record
+    can cross threads as it is.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        if record.exc_info and not record.exc_text:
+            # Tracebacks keep frames alive; render them while they are still accurate
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+_listener: logging.handlers.QueueListener | None = None
+
+
+def stop_listener():
+    """Write out every queued record and stop the writer thread (a no-op in synchronous mode)."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+atexit.register(stop_listener)
+
+
+def configure_logging(use_queue: bool = False, json_lines: bool = False, stream=None,
+                      level: int = logging.INFO):
+    """Install the root handler, replacing any earlier one (and its writer thread)."""
+    global _listener
+    stop_listener()
+    sink = logging.StreamHandler(stream or sys.stderr)
+    sink.setFormatter(JsonFormatter() if json_lines else logging.Formatter(TEXT_FORMAT))
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.setLevel(level)
+
+    if use_queue:
+        handler = DeferredQueueHandler(queue.SimpleQueue())
+        _listener = logging.handlers.QueueListener(handler.queue, sink, respect_handler_level=True)
+        _listener.start()
+    else:
+        handler = sink
+    # Filters run on the calling thread, where the game context is visible
+    handler.addFilter(ThrottleFilter())
+    if json_lines:
+        handler.addFilter(GameContextFilter())
+    root.addHandler(handler)
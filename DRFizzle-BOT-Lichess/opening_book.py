@@ -0,0 +1,52 @@
+"""
+Polyglot opening book stage.
+
+Books are opened once and stay memory-mapped (chess.polyglot.open_reader);
+positions are looked up by their Zobrist key and a move is picked at random
+weighted by the book entry weights. Each variant has its own book, so a
+variant without one (chess960 by default) always goes to the engine.
+"""
+
+import random
+import logging
+import chess
+import chess.polyglot
+
+logger = logging.getLogger(__name__)
+
+BOOK_MAX_PLY = 30  # Stop consulting the book after this many plies
+
+
+class OpeningBook:
+    def __init__(self, paths: dict[str, str], max_ply: int = BOOK_MAX_PLY):
+        # variant key -> path of a polyglot .bin file
+        self.paths = {variant: path for variant, path in paths.items() if path}
+        self.max_ply = max_ply
+        self._readers: dict[str, chess.polyglot.MemoryMappedReader] = {}
+
+    def open(self):
+        for variant, path in self.paths.items():
+            try:
+                self._readers[variant] = chess.polyglot.open_reader(path)
+                logger.info(f"Opened {variant} opening book: {path}")
+            except Exception as e:
+                logger.error(f"Failed to open {variant} opening book {path}: {e}")
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self._readers)
+
+    def choose(self, board: chess.Board, variant: str) -> chess.Move | None:
+        """Weighted random book move for the position, or None if the book has no entry."""
+        reader = self._readers.get(variant)
+        if reader is None or board.ply() >= self.max_ply:
+            return None
+        try:
+            return reader.weighted_choice(board, random=random).move
+        except IndexError:
+            return None
+
+    def close(self):
+        for reader in self._readers.values():
+            reader.close()
+        self._readers.clear()
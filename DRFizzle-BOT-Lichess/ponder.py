@@ -0,0 +1,65 @@
+"""
+Ponder bookkeeping.
+
+With pondering enabled the engine keeps searching the reply it expects
+(the ponder move from its PV) while the opponent's clock runs. python-chess
+sends ``ponderhit`` when the next play() call is for the predicted position
+and ``stop`` otherwise; this module only tracks how often the prediction was
+right and how long replies took in each case.
+"""
+
+import threading
+import logging
+import statistics
+import chess
+
+logger = logging.getLogger(__name__)
+
+HIT = "ponder_hit"
+MISS = "ponder_miss"
+OFF = "no_ponder"
+MAX_SAMPLES = 5000  # Latency samples kept per bucket
+
+
+def classify(board: chess.Board, expected: chess.Move | None) -> str:
+    """Bucket for the move about to be searched, given the reply we pondered on."""
+    if expected is None:
+        return OFF
+    if board.move_stack and board.move_stack[-1] == expected:
+        return HIT
+    return MISS
+
+
+class PonderStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._latencies: dict[str, list[float]] = {HIT: [], MISS: [], OFF: []}
+
+    def record(self, bucket: str, latency: float):
+        with self._lock:
+            samples = self._latencies[bucket]
+            samples.append(latency)
+            if len(samples) > MAX_SAMPLES:
+                del samples[:len(samples) - MAX_SAMPLES]
+
+    @property
+    def hit_rate(self) -> float | None:
+        with self._lock:
+            hits, misses = len(self._latencies[HIT]), len(self._latencies[MISS])
+        return hits / (hits + misses) if hits + misses else None
+
+    def median_latency(self, bucket: str) -> float | None:
+        with self._lock:
+            samples = list(self._latencies[bucket])
+        return statistics.median(samples) if samples else None
+
+    def log_summary(self):
+        with self._lock:
+            hits, misses = len(self._latencies[HIT]), len(self._latencies[MISS])
+        hit_rate = self.hit_rate
+        if hit_rate is not None:
+            logger.info(f"Ponder: hit rate {hit_rate:.0%} ({hits}/{hits + misses})")
+        for bucket in (HIT, MISS, OFF):
+            median = self.median_latency(bucket)
+            if median is not None:
+                logger.info(f"Ponder: median reply latency {bucket}: {median * 1000:.1f} ms")
@@ -0,0 +1,145 @@
+"""
+Sampling profiler for a running bot, across all threads.
+
+A background thread periodically snapshots the Python stack of every
+thread (sys._current_frames) and counts identical stacks. Nothing is
+instrumented, so the bot pays only for the snapshots and can be profiled
+under production load without a restart: a signal starts and stops a
+session, or a low-rate session runs for the whole shift. When a session
+stops it writes a collapsed-stacks file (one "frame;frame;... count" line
+per stack, the input format of flamegraph.pl and speedscope) and logs the
+functions that were on CPU most often.
+"""
+
+import os
+import sys
+import time
+import threading
+import logging
+from collections import Counter
+
+logger = logging.getLogger(__name__)
+
+SAMPLE_INTERVAL = 0.005  # Seconds between samples for an on-demand session
+CONTINUOUS_INTERVAL = 0.1  # Seconds between samples for a whole-shift session
+MAX_DEPTH = 64  # Deeper stacks are truncated at the outermost frames
+TOP_FUNCTIONS = 5  # Leaf functions listed in the log when a dump is written
+# Leaf frames of threads that are blocked, not computing; left out of the top-functions log line
+IDLE_LEAVES = (
+    'wait (threading.py', '_wait_for_tstate_lock (threading.py', 'select (selectors.py',
+    'readinto (socket.py', 'get (queue.py', 'dequeue (handlers.py', '_do_waitpid (unix_events.py',
+)
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+def collapse_stack(thread_name: str, frame) -> str:
+    labels = []
+    while frame is not None and len(labels) < MAX_DEPTH:
+        labels.append(_frame_label(frame))
+        frame = frame.f_back
+    labels.append(thread_name)
+    return ";".join(reversed(labels))
+
+
+class SamplingProfiler:
+    """
+    start() spawns the sampling thread and logs, so it must not run inside a signal
+    handler: the handler calls request_toggle(), which only counts the request, and
+    the main loop applies it with poll(). The sampling thread writes the dump itself
+    once it sees the stop.
+    """
+
+    def __init__(self, name: str, directory: str, interval: float = SAMPLE_INTERVAL):
+        self.name = name
+        self.directory = directory
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        # Toggles asked for by the signal handler (its only write) and applied by poll()
+        self._toggle_requests = 0
+        self._toggles_applied = 0
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and not self._stop.is_set()
+
+    def start(self):
+        if self.running:
+            return
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, args=(self._stop,),
+                                        name=f"profiler-{self.name}", daemon=True)
+        self._thread.start()
+        logger.info(f"Profiler {self.name}: sampling every {self.interval * 1000:.0f} ms")
+
+    def stop(self):
+        if self.running:
+            self._stop.set()
+
+    def toggle(self):
+        if self.running:
+            self.stop()
+        else:
+            self.start()
+
+    def request_toggle(self):
+        """Ask for a toggle from a signal handler; takes no locks and starts nothing."""
+        self._toggle_requests += 1
+
+    def poll(self):
+        """Apply the toggles requested since the last poll (two cancel out)."""
+        requested = self._toggle_requests
+        if (requested - self._toggles_applied) % 2:
+            self.toggle()
+        self._toggles_applied = requested
+
+    def close(self, timeout: float = 5.0):
+        """Stop the session and wait for its dump to be written (for shutdown)."""
+        thread = self._thread
+        self.stop()
+        if thread is not None:
+            thread.join(timeout)
+
+    def _run(self, stop: threading.Event):
+        stacks: Counter[str] = Counter()
+        own = threading.get_ident()
+        started = time.monotonic()
+        samples = 0
+        while not stop.wait(self.interval):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident != own:
+                    stacks[collapse_stack(names.get(ident, f"thread-{ident}"), frame)] += 1
+            samples += 1
+        self._dump(stacks, samples, time.monotonic() - started)
+
+    def _dump(self, stacks: Counter, samples: int, seconds: float):
+        if not stacks:
+            logger.info(f"Profiler {self.name}: stopped after {seconds:.0f}s with no samples")
+            return
+        path = os.path.join(self.directory,
+                            f"{self.name}-{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}.collapsed")
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            with open(path, 'w', encoding='utf-8') as f:
+                for stack, count in stacks.most_common():
+                    f.write(f"{stack} {count}\n")
+        except OSError as e:
+            logger.error(f"Profiler {self.name}: failed to write {path}: {e}")
+            return
+        logger.info(f"Profiler {self.name}: {samples} samples over {seconds:.0f}s written to {path}")
+        leaves: Counter[str] = Counter()
+        for stack, count in stacks.items():
+            leaf = stack.rsplit(";", 1)[-1]
+            if not leaf.startswith(IDLE_LEAVES):
+                leaves[leaf] += count
+        total = sum(leaves.values())
+        if not total:
+            return
+        logger.info(f"Profiler {self.name}: top busy functions: " + ", ".join(
+            f"{label} {count / total:.0%}" for label, count in leaves.most_common(TOP_FUNCTIONS)
+        ))
@@ -0,0 +1,177 @@
+"""
+Client-side rate limiting for every Lichess API call.
+
+Outgoing requests are grouped into endpoint classes (moves, challenges,
+roster, challenge answers, other), each drawing from its own token bucket.
+Moves always go first: while a move is waiting, other classes hold back.
+When Lichess answers 429, all traffic pauses for the mandated time
+(Retry-After, or the full minute the API docs ask for). Bucket levels and
+throttling counters are exposed for metrics and the shutdown summary.
+"""
+
+import re
+import time
+import asyncio
+import threading
+import logging
+
+logger = logging.getLogger(__name__)
+
+MOVE = "move"
+CHALLENGE = "challenge"
+ROSTER = "roster"
+ANSWER = "answer"
+OTHER = "other"
+STREAM = "stream"  # Long-lived streams only respect the global pause
+
+# (path pattern, endpoint class); the first match wins
+ENDPOINT_CLASSES = [
+    (re.compile(r"/api/bot/game/[^/]+/move/"), MOVE),
+    (re.compile(r"/api/challenge/[^/]+/(accept|decline)"), ANSWER),
+    (re.compile(r"/api/challenge/"), CHALLENGE),
+    (re.compile(r"/api/bot/online"), ROSTER),
+    (re.compile(r"/api/stream/event|/api/bot/game/stream/"), STREAM),
+]
+
+# Endpoint class -> (tokens per second, burst)
+BUCKET_RATES = {
+    MOVE: (20.0, 20),
+    CHALLENGE: (1.0, 6),
+    ROSTER: (0.2, 2),
+    ANSWER: (2.0, 10),
+    OTHER: (2.0, 10),
+}
+RATE_LIMIT_PAUSE = 60.0  # Seconds to stop all traffic after a 429 without Retry-After
+MOVE_PRIORITY_YIELD = 0.01  # Seconds other classes back off while a move is waiting
+
+
+def endpoint_class(path: str) -> str:
+    for pattern, cls in ENDPOINT_CLASSES:
+        if pattern.search(path):
+            return cls
+    return OTHER
+
+
+class TokenBucket:
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self._updated = time.monotonic()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.burst, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def take(self, now: float) -> float:
+        """Take a token and return 0, or return the seconds until one is available."""
+        self._refill(now)
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    def level(self, now: float) -> float:
+        self._refill(now)
+        return self.tokens
+
+
+class RateGovernor:
+    def __init__(self, rates: dict[str, tuple[float, int]] = BUCKET_RATES):
+        self._lock = threading.Lock()
+        self.buckets = {cls: TokenBucket(rate, burst) for cls, (rate, burst) in rates.items()}
+        self.paused_until = 0.0
+        self._moves_waiting = 0
+        self.rate_limited = 0
+        # Endpoint class -> seconds callers spent waiting for the governor
+        self.throttled_seconds: dict[str, float] = {}
+
+    def _reserve(self, cls: str) -> float:
+        """Claim a slot for one request of class cls; returns 0, or how long to wait before retrying."""
+        now = time.monotonic()
+        with self._lock:
+            if now < self.paused_until:
+                return self.paused_until - now
+            if cls != MOVE and self._moves_waiting:
+                return MOVE_PRIORITY_YIELD
+            bucket = self.buckets.get(cls)
+            return bucket.take(now) if bucket is not None else 0.0
+
+    def _waited(self, cls: str, seconds: float):
+        if seconds > 0:
+            with self._lock:
+                self.throttled_seconds[cls] = self.throttled_seconds.get(cls, 0.0) + seconds
+
+    def ready_in(self, cls: str) -> float:
+        """Seconds until a request of class cls would be let through, without claiming a token."""
+        now = time.monotonic()
+        with self._lock:
+            wait = max(0.0, self.paused_until - now)
+            bucket = self.buckets.get(cls)
+            if bucket is not None:
+                tokens = bucket.level(now)
+                if tokens < 1:
+                    wait = max(wait, (1 - tokens) / bucket.rate)
+        return wait
+
+    def acquire(self, cls: str):
+        """Block until a request of class cls may be sent."""
+        started = time.monotonic()
+        self._enter(cls)
+        try:
+            while (delay := self._reserve(cls)) > 0:
+                time.sleep(delay)
+        finally:
+            self._leave(cls)
+        self._waited(cls, time.monotonic() - started)
+
+    async def acquire_async(self, cls: str):
+        started = time.monotonic()
+        self._enter(cls)
+        try:
+            while (delay := self._reserve(cls)) > 0:
+                await asyncio.sleep(delay)
+        finally:
+            self._leave(cls)
+        self._waited(cls, time.monotonic() - started)
+
+    def _enter(self, cls: str):
+        if cls == MOVE:
+            with self._lock:
+                self._moves_waiting += 1
+
+    def _leave(self, cls: str):
+        if cls == MOVE:
+            with self._lock:
+                self._moves_waiting -= 1
+
+    def record_response(self, status: int, headers) -> bool:
+        """Start the global pause on a 429; returns True if the response was rate limited."""
+        if status != 429:
+            return False
+        try:
+            pause = float(headers.get('retry-after') or RATE_LIMIT_PAUSE)
+        except (TypeError, ValueError):
+            pause = RATE_LIMIT_PAUSE
+        with self._lock:
+            self.rate_limited += 1
+            self.paused_until = max(self.paused_until, time.monotonic() + pause)
+        logger.warning("Rate limited by Lichess: pausing all API calls for %.0fs", pause)
+        return True
+
+    def levels(self) -> dict[str, float]:
+        """Tokens currently available per endpoint class."""
+        now = time.monotonic()
+        with self._lock:
+            return {cls: bucket.level(now) for cls, bucket in self.buckets.items()}
+
+    @property
+    def paused(self) -> bool:
+        return time.monotonic() < self.paused_until
+
+    def log_summary(self):
+        with self._lock:
+            throttled = dict(self.throttled_seconds)
+        waited = ", ".join(f"{cls} {seconds:.1f}s" for cls, seconds in sorted(throttled.items()) if seconds >= 0.05)
+        logger.info(f"Rate limits: {self.rate_limited} HTTP 429 response(s); "
+                    f"time spent throttled: {waited or 'none'}")
@@ -0,0 +1,122 @@
+"""
+Capture and replay of the Lichess event and game streams.
+
+In capture mode every raw NDJSON line of the incoming-event stream and of
+each game stream is copied to a file per stream in a directory named after
+the shift's start time. Each record is {"t": <seconds since the capture
+started>, "line": <the raw line>}. The raw line is spliced in as is, so
+capturing costs no extra JSON encoding and the replay hands the exact
+bytes Lichess sent to the same decoder. A ReplaySource plays a capture
+back at the original pace, scaled, or as fast as possible.
+"""
+
+import os
+import json
+import time
+import threading
+import logging
+from typing import Iterable, Iterator
+
+logger = logging.getLogger(__name__)
+
+EVENTS = "events"
+META_FILE = "meta.json"
+_LINE_KEY = b', "line": '
+
+
+def game_stream(game_id: str) -> str:
+    return f"game-{game_id}"
+
+
+def stream_name(path: str) -> str:
+    """Capture file name (without extension) for a stream endpoint path."""
+    if path.startswith("/api/bot/game/stream/"):
+        return game_stream(path.rsplit("/", 1)[-1])
+    return EVENTS
+
+
+class StreamRecorder:
+    def __init__(self, directory: str):
+        self.directory = os.path.join(directory, time.strftime('%Y%m%d-%H%M%S'))
+        self.started = time.monotonic()
+        self._lock = threading.Lock()
+        self._files: dict[str, object] = {}
+        self.lines = 0
+
+    def start(self, username: str):
+        os.makedirs(self.directory, exist_ok=True)
+        with open(os.path.join(self.directory, META_FILE), 'w', encoding='utf-8') as f:
+            json.dump({'username': username, 'started': time.time()}, f)
+        logger.info(f"Capturing event and game streams to {self.directory}")
+
+    def write(self, name: str, line: bytes):
+        if not line.strip():
+            return
+        record = b'{"t": %.6f' % (time.monotonic() - self.started) + _LINE_KEY + line.strip() + b'}\n'
+        with self._lock:
+            f = self._files.get(name)
+            if f is None:
+                f = self._files[name] = open(os.path.join(self.directory, f"{name}.ndjson"), 'ab')
+            f.write(record)
+            self.lines += 1
+
+    def tee(self, name: str, lines: Iterable[bytes]) -> Iterator[bytes]:
+        for line in lines:
+            self.write(name, line)
+            yield line
+
+    def close(self, name: str):
+        with self._lock:
+            f = self._files.pop(name, None)
+        if f is not None:
+            f.close()
+
+    def close_all(self):
+        with self._lock:
+            files, self._files = list(self._files.values()), {}
+        for f in files:
+            f.close()
+        logger.info(f"Captured {self.lines} stream line(s) to {self.directory}")
+
+
+def read_capture(path: str) -> Iterator[tuple[float, bytes]]:
+    """(offset, raw line) per record of a capture file."""
+    with open(path, 'rb') as f:
+        for record in f:
+            head, sep, rest = record.rstrip(b'\n').partition(_LINE_KEY)
+            if not sep:
+                continue
+            yield float(head[len(b'{"t": '):]), rest[:-1]
+
+
+class ReplaySource:
+    """
+    Serves captured streams. speed scales the recorded pace (2.0 plays twice as fast);
+    0 plays without waiting. All streams share one clock, started when the first
+    stream is opened, so events and game streams interleave as they did live.
+    """
+
+    def __init__(self, directory: str, speed: float = 1.0):
+        self.directory = directory
+        self.speed = speed
+        with open(os.path.join(directory, META_FILE), encoding='utf-8') as f:
+            self.meta = json.load(f)
+        self.username: str = self.meta['username']
+        self._started: float | None = None
+        # Streams read to the end; a game stream opened again after that was cut off by the capture
+        self.finished: set[str] = set()
+
+    def lines(self, name: str) -> Iterator[bytes]:
+        path = os.path.join(self.directory, f"{name}.ndjson")
+        if name in self.finished or not os.path.exists(path):
+            self.finished.add(name)
+            return
+        if self._started is None:
+            self._started = time.monotonic()
+        for offset, line in read_capture(path):
+            if self.speed:
+                delay = self._started + offset / self.speed - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+            yield line
+        self.finished.add(name)
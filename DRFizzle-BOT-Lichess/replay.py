@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Offline replay of a captured shift (RECORD_DIR) through the bot's own handlers.
+
+The captured event stream is fed to the same event dispatch, and every game
+runs the same _play_game loop as live: board sync, book, tablebase and
+engine. The only differences are that stream lines come from the capture
+and that API calls (moves, challenge answers) go nowhere. Games whose
+capture stops early are ended when their stream runs dry. Replays are
+deterministic in input and timing, so they serve for profiling and for
+regression benchmarks of the event-handling path.
+
+Usage: python DRFizzle-BOT-Lichess/replay.py <capture dir> [speed]
+speed: 1 (default) keeps the recorded pace, 4 plays four times faster, 0 as fast as possible.
+"""
+
+import sys
+import time
+import threading
+import logging
+from collections import Counter
+from types import SimpleNamespace
+from typing import Iterator
+
+from lichess_bot import LichessBot, EXIT_STARTUP_FAILED
+from recording import ReplaySource, EVENTS, stream_name
+from roster import parse_lines
+
+logger = logging.getLogger(__name__)
+
+# Sent in place of a reconnect once a game's capture is exhausted
+CAPTURE_ENDED = b'{"type": "gameState", "status": "unknownFinish", "moves": ""}'
+
+
+class OfflineApi:
+    """Stands in for the berserk client sections during a replay: every call succeeds and is counted."""
+
+    def __init__(self):
+        self.calls: Counter[str] = Counter()
+
+    def __getattr__(self, name: str):
+        def call(*args, **kwargs):
+            self.calls[name] += 1
+            return {}
+        return call
+
+
+class ReplayBot(LichessBot):
+    def __init__(self, source: ReplaySource):
+        super().__init__("replay")
+        self.source = source
+        self.username = source.username
+        self.api = OfflineApi()
+        self.client = SimpleNamespace(bots=self.api, challenges=self.api, account=self.api)
+        self._game_threads: list[threading.Thread] = []
+
+    def _stream_lines(self, path: str) -> Iterator[bytes]:
+        name = stream_name(path)
+        if name != EVENTS and name in self.source.finished:
+            logger.info(f"Replay: capture of {name} ends before the game does")
+            yield CAPTURE_ENDED
+            return
+        yield from self.source.lines(name)
+
+    def _start_game(self, game_id: str):
+        thread = threading.Thread(target=self._play_game, args=(game_id,), daemon=True)
+        self._game_threads.append(thread)
+        thread.start()
+
+    def run(self):
+        logger.info(f"Replaying {self.source.directory} as {self.username} "
+                    f"at {'full' if not self.source.speed else f'{self.source.speed:g}x'} speed")
+        if not self._init_engine():
+            sys.exit(EXIT_STARTUP_FAILED)
+        self.book.open()
+        self.tablebase.open()
+        started = time.monotonic()
+        try:
+            for event in parse_lines(self._stream_lines("/api/stream/event")):
+                self._handle_event(event)
+            for thread in self._game_threads:
+                thread.join()
+        finally:
+            self.challenger_running = False
+            self.running = False
+            self._cleanup()
+        logger.info(f"Replay: {len(self._game_threads)} game(s), {self.api.calls['make_move']} move(s) "
+                    f"in {time.monotonic() - started:.1f}s")
+
+
+def main():
+    if len(sys.argv) < 2:
+        print(__doc__)
+        sys.exit(2)
+    speed = float(sys.argv[2]) if len(sys.argv) > 2 else 1.0
+    ReplayBot(ReplaySource(sys.argv[1], speed)).run()
+
+
+if __name__ == "__main__":
+    main()
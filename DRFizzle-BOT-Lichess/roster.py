@@ -0,0 +1,237 @@
+"""
+Cached roster of online bots.
+
+The online-bot list is refreshed in the background on its own interval
+instead of on every challenge. Each snapshot indexes bots by perf type
+(bullet/blitz/rapid/classical) in rating-sorted arrays, so picking an
+opponent inside a rating band is two bisections plus a random index, and
+costs no API traffic between refreshes.
+
+The NDJSON response is consumed line by line: a snapshot keeps only the id,
+name and ratings of each bot, and sample_opponent picks a target with
+reservoir sampling and stops reading once it has seen enough candidates.
+"""
+
+import json
+import time
+import random
+import bisect
+import threading
+import logging
+from typing import Callable, Iterable, Iterator
+
+from log_setup import THROTTLE
+
+logger = logging.getLogger(__name__)
+
+PERF_TYPES = ('bullet', 'blitz', 'rapid', 'classical')
+DEFAULT_RATING = 1500  # Rating assumed for bots that have not played a perf type
+ROSTER_TTL = 180  # Seconds after which a roster that failed to refresh is not used
+PICK_ATTEMPTS = 8  # Random draws before falling back to a scan when exclusions hit
+SAMPLE_ENOUGH = 20  # Eligible bots seen before sample_opponent stops reading the stream
+
+
+def speed_for_clock(limit: int, increment: int) -> str:
+    """Lichess speed category of a clock, from the estimated game duration limit + 40 * increment."""
+    estimate = limit + 40 * increment
+    if estimate < 180:
+        return 'bullet'
+    if estimate < 480:
+        return 'blitz'
+    if estimate < 1500:
+        return 'rapid'
+    return 'classical'
+
+
+def parse_lines(lines: Iterable[bytes | str]) -> Iterator[dict]:
+    """Decode an NDJSON body one line at a time, skipping keep-alive blank lines."""
+    for line in lines:
+        if line and line.strip():
+            yield json.loads(line)
+
+
+def bot_id(bot: dict) -> str:
+    return (bot.get('id') or bot.get('username') or '').lower()
+
+
+def bot_rating(bot: dict, perf: str) -> int:
+    return bot.get('perfs', {}).get(perf, {}).get('rating', DEFAULT_RATING)
+
+
+class OpponentSample:
+    """
+    Uniform pick among the first `enough` eligible bots offered, holding one bot at a time.
+    offer() returns True once `enough` candidates have been seen, so the caller can stop
+    consuming its stream, whether that is a blocking or an async one.
+    """
+
+    def __init__(self, perf: str, min_rating: int, max_rating: int, exclude: set[str] = frozenset(),
+                 enough: int = SAMPLE_ENOUGH, rng: random.Random | None = None):
+        self.perf = perf
+        self.min_rating = min_rating
+        self.max_rating = max_rating
+        self.exclude = exclude
+        self.enough = enough
+        self.rng = rng or random
+        self.chosen: dict | None = None
+        self.seen = 0
+
+    def offer(self, bot: dict) -> bool:
+        rating = bot_rating(bot, self.perf)
+        if not self.min_rating <= rating <= self.max_rating or bot_id(bot) in self.exclude:
+            return False
+        self.seen += 1
+        # Reservoir of size one: the n-th candidate replaces the current pick with probability 1/n
+        if self.rng.randrange(self.seen) == 0:
+            self.chosen = {'username': bot.get('username') or bot.get('id'), 'rating': rating}
+        return self.seen >= self.enough
+
+
+def sample_opponent(bots: Iterable[dict], perf: str, min_rating: int, max_rating: int,
+                    exclude: set[str] = frozenset(), enough: int = SAMPLE_ENOUGH,
+                    rng: random.Random | None = None) -> dict | None:
+    """Pick from a stream of bots with OpponentSample, stopping as soon as enough candidates were seen."""
+    sample = OpponentSample(perf, min_rating, max_rating, exclude, enough, rng)
+    for bot in bots:
+        if sample.offer(bot):
+            break
+    return sample.chosen
+
+
+class Roster:
+    """Snapshot of online bots with a rating index per perf type, filled by add() and sealed by finish()."""
+
+    def __init__(self):
+        self.fetched_at = time.monotonic()
+        # lowercase id -> display name
+        self.names: dict[str, str] = {}
+        self._entries: dict[str, list[tuple[int, str]]] = {perf: [] for perf in PERF_TYPES}
+        self._ratings: dict[str, list[int]] = {}
+        self._ids: dict[str, list[str]] = {}
+
+    @classmethod
+    def from_bots(cls, bots: Iterable[dict]) -> 'Roster':
+        roster = cls()
+        for bot in bots:
+            roster.add(bot)
+        roster.finish()
+        return roster
+
+    def add(self, bot: dict):
+        """Index one bot; only its id, name and ratings are kept, not the decoded dict."""
+        key = bot_id(bot)
+        if not key:
+            return
+        self.names[key] = bot.get('username') or bot.get('id')
+        for perf in PERF_TYPES:
+            self._entries[perf].append((bot_rating(bot, perf), key))
+
+    def finish(self):
+        self.fetched_at = time.monotonic()
+        for perf, entries in self._entries.items():
+            entries.sort()
+            self._ratings[perf] = [rating for rating, _ in entries]
+            self._ids[perf] = [key for _, key in entries]
+        self._entries = {}
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def _band(self, perf: str, min_rating: int, max_rating: int) -> tuple[int, int]:
+        ratings = self._ratings[perf]
+        return bisect.bisect_left(ratings, min_rating), bisect.bisect_right(ratings, max_rating)
+
+    def count(self, perf: str, min_rating: int, max_rating: int) -> int:
+        lo, hi = self._band(perf, min_rating, max_rating)
+        return hi - lo
+
+    def pick(self, perf: str, min_rating: int, max_rating: int,
+             exclude: set[str] = frozenset(), rng: random.Random | None = None) -> dict | None:
+        """Random bot rated within [min_rating, max_rating] for perf, skipping ids in exclude."""
+        rng = rng or random
+        lo, hi = self._band(perf, min_rating, max_rating)
+        if lo >= hi:
+            return None
+        ids, ratings = self._ids[perf], self._ratings[perf]
+        for _ in range(PICK_ATTEMPTS):
+            i = rng.randrange(lo, hi)
+            if ids[i] not in exclude:
+                return {'username': self.names[ids[i]], 'rating': ratings[i]}
+        candidates = [i for i in range(lo, hi) if ids[i] not in exclude]
+        if not candidates:
+            return None
+        i = rng.choice(candidates)
+        return {'username': self.names[ids[i]], 'rating': ratings[i]}
+
+    def candidates(self, perf: str, min_rating: int, max_rating: int, count: int,
+                   exclude: set[str] = frozenset(), rng: random.Random | None = None) -> list[dict]:
+        """Up to count distinct random bots rated within the band, skipping ids in exclude."""
+        rng = rng or random
+        lo, hi = self._band(perf, min_rating, max_rating)
+        ids, ratings = self._ids[perf], self._ratings[perf]
+        chosen = []
+        # Oversample so a few excluded bots do not shrink the list
+        for i in rng.sample(range(lo, hi), min(hi - lo, count * 2)):
+            if ids[i] not in exclude:
+                chosen.append({'username': self.names[ids[i]], 'rating': ratings[i]})
+                if len(chosen) == count:
+                    break
+        return chosen
+
+
+class RosterCache:
+    def __init__(self, fetch: Callable[[], Iterable[dict]] | None, refresh_interval: float,
+                 ttl: float = ROSTER_TTL):
+        self.fetch = fetch
+        self.refresh_interval = refresh_interval
+        self.ttl = ttl
+        self._roster: Roster | None = None
+        self._stop = threading.Event()
+        self.refreshes = 0
+
+    def update(self, bots: Iterable[dict]) -> Roster:
+        return self.install(Roster.from_bots(bots))
+
+    def install(self, roster: Roster) -> Roster:
+        """Replace the current snapshot and log who came and went."""
+        previous = self._roster
+        self._roster = roster
+        self.refreshes += 1
+        if previous is not None:
+            appeared = roster.names.keys() - previous.names.keys()
+            left = previous.names.keys() - roster.names.keys()
+            if appeared or left:
+                logger.info("Roster: %s bots online (+%s / -%s)", len(roster), len(appeared), len(left))
+        else:
+            logger.info("Roster: %s bots online", len(roster))
+        return roster
+
+    def current(self) -> Roster | None:
+        """Latest snapshot, or None if there is none or it is older than the TTL."""
+        roster = self._roster
+        if roster is None or time.monotonic() - roster.fetched_at > self.ttl:
+            return None
+        return roster
+
+    def offer(self, roster: Roster):
+        """Install a freshly fetched snapshot unless it is empty."""
+        # An empty roster usually means the fetch failed; keep the old snapshot until it expires
+        if len(roster):
+            self.install(roster)
+
+    def refresh(self):
+        self.offer(Roster.from_bots(self.fetch()))
+
+    def start(self):
+        threading.Thread(target=self._refresh_loop, daemon=True).start()
+
+    def _refresh_loop(self):
+        while not self._stop.is_set():
+            try:
+                self.refresh()
+            except Exception as e:
+                logger.error("Failed to refresh roster: %s", e, extra=THROTTLE)
+            self._stop.wait(self.refresh_interval)
+
+    def stop(self):
+        self._stop.set()
@@ -0,0 +1,271 @@
+"""
+Opponent scheduler for outgoing challenges.
+
+Remembers what happened to every challenge the bot sent: accepted (Lichess
+starts the game under the challenge id), declined, canceled or never
+answered, and how long the opponent took to make its first move. Bots that
+keep declining or never start are put on an exponentially growing
+cooldown, a bot that was just played gets a rematch cooldown, and the
+remaining candidates are ranked by observed acceptance rate and
+responsiveness.
+
+It also sizes the challenge pipeline: how many challenges to keep
+outstanding per free slot, from the observed acceptance rate and how long
+opponents take to answer.
+"""
+
+import math
+import time
+import random
+import threading
+import logging
+
+logger = logging.getLogger(__name__)
+
+FAILURE_COOLDOWN = 60  # Seconds a bot is skipped after a declined or unanswered challenge
+MAX_COOLDOWN = 3600  # Upper bound for the exponential backoff per bot
+REMATCH_COOLDOWN = 300  # Seconds before a bot we just played is challenged again
+PENDING_TIMEOUT = 20  # A challenge with no answer after this long counts as unanswered
+DEFAULT_FIRST_MOVE = 2.0  # Assumed time-to-first-move (seconds) for bots never played
+FIRST_MOVE_REFERENCE = 10.0  # Time-to-first-move (seconds) that halves a bot's score
+BUSY_DECLINES = ('later', 'toomanygames')  # Declines that say "not now" rather than "not you"
+NO_START_STATUSES = ('noStart', 'aborted')
+MAX_OUTSTANDING_PER_SLOT = 3  # Upper bound for challenges in flight per free slot
+ANSWER_LATENCY_REFERENCE = 5.0  # Answer latency (seconds) at which the pipeline is fully widened
+
+
+class _OpponentRecord:
+    def __init__(self):
+        self.sent = 0
+        self.accepted = 0
+        self.declined = 0
+        self.unanswered = 0
+        # Failures since the last accepted challenge; drives the backoff exponent
+        self.failures = 0
+        self.cooldown_until = 0.0
+        # Moving average of seconds from game start to the opponent's first move
+        self.first_move: float | None = None
+
+
+class OpponentScheduler:
+    def __init__(self, rng: random.Random | None = None):
+        self.rng = rng or random.Random()
+        self._lock = threading.Lock()
+        self._records: dict[str, _OpponentRecord] = {}
+        # challenge id -> (bot id, time sent), oldest first
+        self._pending: dict[str, tuple[str, float]] = {}
+        # Pending challenges that timed out and still have to be canceled on Lichess
+        self._expired: list[str] = []
+        # Moving average of seconds from sending a challenge to its accept or decline
+        self.answer_latency: float | None = None
+        # game id -> (bot id, game start time) until the opponent's first move or the game end
+        self._starting: dict[str, tuple[str, float]] = {}
+        self.sent = 0
+        self.accepted = 0
+        self.declined = 0
+        self.unanswered = 0
+        # Challenges we canceled ourselves; they are taken back out of sent
+        self.withdrawn = 0
+
+    def _record(self, bot_id: str) -> _OpponentRecord:
+        record = self._records.get(bot_id)
+        if record is None:
+            record = self._records[bot_id] = _OpponentRecord()
+        return record
+
+    def _answered(self, sent_at: float, now: float):
+        seconds = now - sent_at
+        if self.answer_latency is None:
+            self.answer_latency = seconds
+        else:
+            self.answer_latency = 0.8 * self.answer_latency + 0.2 * seconds
+
+    def _fail(self, record: _OpponentRecord, now: float, escalate: bool = True):
+        if escalate:
+            record.failures += 1
+        cooldown = min(MAX_COOLDOWN, FAILURE_COOLDOWN * 2 ** max(0, record.failures - 1))
+        record.cooldown_until = max(record.cooldown_until, now + cooldown)
+
+    def record_sent(self, challenge_id: str, username: str):
+        bot_id = username.lower()
+        with self._lock:
+            self._pending[challenge_id] = (bot_id, time.monotonic())
+            self._record(bot_id).sent += 1
+            self.sent += 1
+
+    def record_declined(self, challenge_id: str, reason: str | None = None) -> bool:
+        """Returns False if the challenge was not one of ours."""
+        with self._lock:
+            pending = self._pending.pop(challenge_id, None)
+            if pending is None:
+                return False
+            now = time.monotonic()
+            record = self._record(pending[0])
+            record.declined += 1
+            self.declined += 1
+            self._answered(pending[1], now)
+            self._fail(record, now, escalate=(reason or '').lower() not in BUSY_DECLINES)
+        logger.info("Challenge %s declined by %s (%s)", challenge_id, pending[0], reason or 'no reason')
+        return True
+
+    def record_canceled(self, challenge_id: str) -> bool:
+        """Returns False if the challenge was not one of ours."""
+        with self._lock:
+            pending = self._pending.pop(challenge_id, None)
+            if pending is None:
+                return False
+            record = self._record(pending[0])
+            record.unanswered += 1
+            self.unanswered += 1
+            self._fail(record, time.monotonic())
+        return True
+
+    def record_withdrawn(self, challenge_id: str) -> bool:
+        """
+        We canceled the challenge ourselves; the opponent is not penalised. Returns False if
+        the challenge was no longer pending (answered, or already a game) and must not be canceled.
+        """
+        with self._lock:
+            pending = self._pending.pop(challenge_id, None)
+            if pending is None:
+                return False
+            self._record(pending[0]).sent -= 1
+            self.sent -= 1
+            self.withdrawn += 1
+        return True
+
+    def record_game_start(self, game_id: str, opponent: str | None):
+        now = time.monotonic()
+        with self._lock:
+            pending = self._pending.pop(game_id, None)
+            bot_id = pending[0] if pending else (opponent or '').lower()
+            if not bot_id:
+                return
+            record = self._record(bot_id)
+            if pending is not None:
+                record.accepted += 1
+                self.accepted += 1
+                self._answered(pending[1], now)
+            record.failures = 0
+            record.cooldown_until = now + REMATCH_COOLDOWN
+            self._starting[game_id] = (bot_id, now)
+
+    def record_opponent_move(self, game_id: str):
+        """Called whenever the opponent has moved; only the first call per game is measured."""
+        if game_id not in self._starting:
+            return
+        with self._lock:
+            starting = self._starting.pop(game_id, None)
+            if starting is None:
+                return
+            bot_id, started = starting
+            record = self._record(bot_id)
+            seconds = time.monotonic() - started
+            if record.first_move is None:
+                record.first_move = seconds
+            else:
+                record.first_move = 0.7 * record.first_move + 0.3 * seconds
+
+    def record_game_end(self, game_id: str, status: str | None):
+        """status None: the game loop ended without seeing the result; only forget the game."""
+        with self._lock:
+            starting = self._starting.pop(game_id, None)
+            if starting is not None and status in NO_START_STATUSES:
+                # Accepted but never moved: as good as a decline
+                self._fail(self._record(starting[0]), time.monotonic())
+
+    def _expire_pending(self, now: float):
+        for challenge_id, (bot_id, sent_at) in list(self._pending.items()):
+            if now - sent_at > PENDING_TIMEOUT:
+                del self._pending[challenge_id]
+                self._expired.append(challenge_id)
+                record = self._record(bot_id)
+                record.unanswered += 1
+                self.unanswered += 1
+                self._fail(record, now)
+
+    def next_expiry(self) -> float | None:
+        """Seconds until the oldest pending challenge counts as unanswered, None if none is pending."""
+        with self._lock:
+            self._expire_pending(time.monotonic())
+            if not self._pending:
+                return None
+            oldest = min(sent_at for _, sent_at in self._pending.values())
+        return max(0.0, oldest + PENDING_TIMEOUT - time.monotonic())
+
+    def take_expired(self) -> list[str]:
+        """Challenges that timed out since the last call, to be canceled on Lichess."""
+        with self._lock:
+            self._expire_pending(time.monotonic())
+            expired, self._expired = self._expired, []
+        return expired
+
+    def pending_ids(self) -> list[str]:
+        """Outstanding challenge ids, oldest first."""
+        with self._lock:
+            return list(self._pending)
+
+    def outstanding_per_slot(self) -> float:
+        """
+        Challenges to keep in flight per free slot. With acceptance probability p, about 1/p
+        challenges fill a slot; they are only sent in parallel to the extent answers are slow,
+        since quick answers make sending them one after another nearly as fast and never overcommit.
+        Until the first answer comes in there is nothing to go on, so it stays at one per slot.
+        """
+        with self._lock:
+            answered = self.accepted + self.declined + self.unanswered
+            if not answered:
+                return 1.0
+            acceptance = (self.accepted + 1) / (answered + 2)
+            latency = self.answer_latency if self.answer_latency is not None else ANSWER_LATENCY_REFERENCE
+        widen = min(1.0, latency / ANSWER_LATENCY_REFERENCE)
+        return max(1.0, min(MAX_OUTSTANDING_PER_SLOT, 1 + (1 / acceptance - 1) * widen))
+
+    def pipeline_target(self, free_slots: int) -> int:
+        if free_slots <= 0:
+            return 0
+        # Rounded down: an extra challenge goes out only once a whole one is warranted, since two
+        # acceptances for one slot mean aborting a game
+        return max(1, math.floor(self.outstanding_per_slot() * free_slots))
+
+    def unavailable(self) -> set[str]:
+        """Bots on cooldown or with a challenge still pending."""
+        now = time.monotonic()
+        with self._lock:
+            self._expire_pending(now)
+            busy = {bot_id for bot_id, _ in self._pending.values()}
+            busy.update(bot_id for bot_id, record in self._records.items() if record.cooldown_until > now)
+        return busy
+
+    def score(self, bot_id: str) -> float:
+        """Estimated acceptance probability, discounted by how slow the bot is to start playing."""
+        record = self._records.get(bot_id)
+        if record is None:
+            accepted, sent, first_move = 0, 0, DEFAULT_FIRST_MOVE
+        else:
+            accepted, sent = record.accepted, record.sent
+            first_move = record.first_move if record.first_move is not None else DEFAULT_FIRST_MOVE
+        # Laplace prior: unseen bots start at 0.5 so they still get explored
+        acceptance = (accepted + 1) / (sent + 2)
+        return acceptance * FIRST_MOVE_REFERENCE / (FIRST_MOVE_REFERENCE + first_move)
+
+    def choose(self, candidates: list[dict]) -> dict | None:
+        """Pick one candidate at random, weighted by score, so good bots are favoured but not hammered."""
+        if not candidates:
+            return None
+        with self._lock:
+            weights = [self.score(candidate['username'].lower()) for candidate in candidates]
+        return self.rng.choices(candidates, weights=weights)[0]
+
+    @property
+    def acceptance_rate(self) -> float:
+        return self.accepted / self.sent if self.sent else 0.0
+
+    def log_summary(self):
+        if not self.sent:
+            return
+        logger.info(f"Challenges: {self.accepted}/{self.sent} accepted per sent ({self.acceptance_rate:.0%}), "
+                    f"{self.declined} declined, {self.unanswered} unanswered")
+        if self.answer_latency is not None:
+            logger.info(f"Challenge answers: {self.answer_latency:.1f}s average latency, "
+                        f"{self.outstanding_per_slot():.1f} in flight per free slot")
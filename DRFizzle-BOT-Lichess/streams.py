@@ -0,0 +1,188 @@
+"""
+Reconnecting wrappers around the Lichess NDJSON streams.
+
+When the HTTP stream behind the incoming-event or a game stream drops, the
+stream is reopened with jittered exponential backoff instead of ending the
+bot or abandoning the game. Lichess starts every game stream with a gameFull
+snapshot, which the game loop uses to resync. Reconnects and the time spent
+disconnected are counted per stream. A stream that has delivered its final
+event (e.g. a game stream after the game ended) is not reopened when the
+server closes it. Game streams also give up at once when the server answers
+404: the game no longer exists, so waiting for it would only hold its slot.
+"""
+
+import time
+import random
+import asyncio
+import threading
+import logging
+from typing import AsyncIterator, Callable, Iterator
+
+logger = logging.getLogger(__name__)
+
+BACKOFF_BASE = 0.5  # Seconds before the first reconnect attempt
+BACKOFF_MAX = 30.0  # Upper bound for the delay between attempts
+GONE_STATUSES = frozenset({404})  # HTTP statuses after which a game stream is never reopened
+
+
+class StreamGaveUp(Exception):
+    pass
+
+
+class StreamGone(StreamGaveUp):
+    """The server says the stream does not exist (e.g. the game is gone)."""
+
+
+def http_status(error: Exception) -> int | None:
+    """HTTP status of a failed request: requests/berserk errors carry a response, AsyncHttpError a status."""
+    response = getattr(error, 'response', None)
+    if response is not None:
+        return getattr(response, 'status_code', None)
+    return getattr(error, 'status', None)
+
+
+class StreamStats:
+    """Reconnect counts and disconnected time per stream, shared by all streams of a bot."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reconnects: dict[str, int] = {}
+        self.gap_seconds: dict[str, float] = {}
+
+    def record_reconnect(self, name: str):
+        with self._lock:
+            self.reconnects[name] = self.reconnects.get(name, 0) + 1
+
+    def record_gap(self, name: str, seconds: float):
+        with self._lock:
+            self.gap_seconds[name] = self.gap_seconds.get(name, 0.0) + seconds
+
+    @property
+    def total_reconnects(self) -> int:
+        with self._lock:
+            return sum(self.reconnects.values())
+
+    def log_summary(self):
+        with self._lock:
+            items = sorted(self.reconnects.items())
+            gaps = dict(self.gap_seconds)
+        for name, count in items:
+            logger.info(f"Stream {name}: {count} reconnect(s), {gaps.get(name, 0.0):.1f}s disconnected")
+
+
+class _Reconnector:
+    def __init__(self, name: str, should_continue: Callable[[], bool],
+                 stats: StreamStats | None = None, max_gap: float | None = None,
+                 is_final: Callable[[dict], object] | None = None,
+                 gone_statuses: frozenset[int] = frozenset()):
+        self.name = name
+        self.should_continue = should_continue
+        self.stats = stats
+        # Give up if the stream stays down longer than this many seconds
+        self.max_gap = max_gap
+        # True for an event after which the stream has nothing more to deliver
+        self.is_final = is_final
+        # HTTP statuses meaning the stream no longer exists; these end it instead of a reconnect
+        self.gone_statuses = gone_statuses
+        self._finished = False
+        self._attempt = 0
+        self._gap_started: float | None = None
+
+    def _connected(self):
+        """Called for the first event after a (re)connect."""
+        if self._gap_started is not None:
+            gap = time.monotonic() - self._gap_started
+            logger.info("Stream %s resumed after %.1fs", self.name, gap)
+            if self.stats is not None:
+                self.stats.record_gap(self.name, gap)
+        self._gap_started = None
+        self._attempt = 0
+
+    def _seen(self, event: dict):
+        if self.is_final is not None and self.is_final(event):
+            self._finished = True
+
+    def _done(self) -> bool:
+        """True if the stream must not be reopened: shutting down, or its final event was delivered."""
+        if self._finished:
+            logger.info("Stream %s ended", self.name)
+            return True
+        return not self.should_continue()
+
+    def _dropped(self, error: Exception | None) -> float:
+        """Record a drop and return the delay before the next attempt."""
+        if error is None:
+            logger.warning("Stream %s closed by server", self.name)
+        elif http_status(error) in self.gone_statuses:
+            raise StreamGone(f"Stream {self.name} is gone: {error}")
+        else:
+            logger.warning("Stream %s dropped: %s", self.name, error)
+        now = time.monotonic()
+        if self._gap_started is None:
+            self._gap_started = now
+        elif self.max_gap is not None and now - self._gap_started > self.max_gap:
+            raise StreamGaveUp(f"Stream {self.name} down for more than {self.max_gap:.0f}s")
+        if self.stats is not None:
+            self.stats.record_reconnect(self.name)
+        ceiling = min(BACKOFF_MAX, BACKOFF_BASE * 2 ** self._attempt)
+        self._attempt += 1
+        # Equal jitter: never reconnect instantly, but spread attempts of many streams
+        return ceiling / 2 + random.uniform(0, ceiling / 2)
+
+
+class ResilientStream(_Reconnector):
+    """Iterate over a blocking event stream, reopening it whenever it drops."""
+
+    def __init__(self, name: str, open_stream: Callable[[], Iterator[dict]],
+                 should_continue: Callable[[], bool], stats: StreamStats | None = None,
+                 max_gap: float | None = None, is_final: Callable[[dict], object] | None = None,
+                 gone_statuses: frozenset[int] = frozenset()):
+        super().__init__(name, should_continue, stats, max_gap, is_final, gone_statuses)
+        self.open_stream = open_stream
+
+    def __iter__(self) -> Iterator[dict]:
+        while self.should_continue():
+            error = None
+            try:
+                for event in self.open_stream():
+                    if self._attempt or self._gap_started is not None:
+                        self._connected()
+                    self._seen(event)
+                    yield event
+            except Exception as e:
+                error = e
+            if self._done():
+                return
+            delay = self._dropped(error)
+            logger.info("Reconnecting stream %s in %.1fs", self.name, delay)
+            time.sleep(delay)
+
+
+class AsyncResilientStream(_Reconnector):
+    """asyncio counterpart of ResilientStream."""
+
+    def __init__(self, name: str, open_stream: Callable[[], AsyncIterator[dict]],
+                 should_continue: Callable[[], bool], stats: StreamStats | None = None,
+                 max_gap: float | None = None, is_final: Callable[[dict], object] | None = None,
+                 gone_statuses: frozenset[int] = frozenset()):
+        super().__init__(name, should_continue, stats, max_gap, is_final, gone_statuses)
+        self.open_stream = open_stream
+
+    async def __aiter__(self) -> AsyncIterator[dict]:
+        while self.should_continue():
+            error = None
+            try:
+                async for event in self.open_stream():
+                    if self._attempt or self._gap_started is not None:
+                        self._connected()
+                    self._seen(event)
+                    yield event
+            except (asyncio.CancelledError, GeneratorExit):
+                raise
+            except Exception as e:
+                error = e
+            if self._done():
+                return
+            delay = self._dropped(error)
+            logger.info("Reconnecting stream %s in %.1fs", self.name, delay)
+            await asyncio.sleep(delay)
@@ -0,0 +1,127 @@
+"""
+Syzygy tablebase stage for endgames.
+
+Positions with no more pieces than the installed tables cover are solved:
+every legal move is probed (WDL, then DTZ) and the best one is played
+directly, so the engine is never asked about a solved position. Results are
+kept in an LRU cache shared by all concurrent games, and probe latency and
+hit ratio are tracked for the shutdown summary.
+"""
+
+import time
+import threading
+import logging
+from collections import OrderedDict
+import chess
+import chess.polyglot
+import chess.syzygy
+
+logger = logging.getLogger(__name__)
+
+TABLEBASE_CACHE_SIZE = 10000  # Probe results kept across games
+
+
+def largest_table(tables: dict) -> int:
+    """Most pieces covered by any indexed table; names like KQvKR have one letter per piece plus the 'v'."""
+    return max((len(name) - 1 for name in tables), default=0)
+
+
+class Tablebase:
+    def __init__(self, directory: str, cache_size: int = TABLEBASE_CACHE_SIZE):
+        self.directory = directory
+        self.cache_size = cache_size
+        self.max_pieces = 0
+        self._tb: chess.syzygy.Tablebase | None = None
+        # (zobrist hash, halfmove clock) -> best move, None if the position could not be probed
+        self._cache: OrderedDict[tuple[int, int], chess.Move | None] = OrderedDict()
+        self._lock = threading.Lock()
+        self.lookups = 0
+        self.hits = 0
+        self.cache_hits = 0
+        self.probe_seconds = 0.0
+        self.probes = 0
+
+    def open(self):
+        """Index the table files; python-chess only opens a table when it is first probed."""
+        if not self.directory:
+            return
+        try:
+            self._tb = chess.syzygy.open_tablebase(self.directory)
+            # Both kinds are probed, so only positions covered by a WDL and a DTZ table are solved
+            self.max_pieces = min(largest_table(self._tb.wdl), largest_table(self._tb.dtz))
+            if not self.max_pieces:
+                logger.warning(f"No Syzygy WDL and DTZ tables found in {self.directory}")
+                return
+            logger.info(f"Opened Syzygy tablebases in {self.directory} (up to {self.max_pieces} pieces)")
+        except Exception as e:
+            logger.error(f"Failed to open Syzygy tablebases in {self.directory}: {e}")
+            self._tb = None
+
+    @property
+    def enabled(self) -> bool:
+        return self._tb is not None and self.max_pieces > 0
+
+    def probe_move(self, board: chess.Board) -> chess.Move | None:
+        """Best move according to the tablebases, or None if the position is not covered."""
+        if (not self.enabled or chess.popcount(board.occupied) > self.max_pieces
+                or board.castling_rights):
+            return None
+        # The 50-move counter decides between blessed and cursed results, so it is part of the key
+        key = (chess.polyglot.zobrist_hash(board), board.halfmove_clock)
+        with self._lock:
+            self.lookups += 1
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                self.cache_hits += 1
+                move = self._cache[key]
+                if move is not None:
+                    self.hits += 1
+                return move
+
+        started = time.perf_counter()
+        move = self._best_move(board.copy(stack=False))
+        elapsed = time.perf_counter() - started
+
+        with self._lock:
+            self.probes += 1
+            self.probe_seconds += elapsed
+            if move is not None:
+                self.hits += 1
+            self._cache[key] = move
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return move
+
+    def _best_move(self, board: chess.Board) -> chess.Move | None:
+        best_move, best_score = None, None
+        try:
+            for move in board.legal_moves:
+                board.push(move)
+                try:
+                    if board.is_checkmate():
+                        return move
+                    # Scores are from the opponent's side after our move. Maximising
+                    # (-wdl, dtz) wins fastest, and delays a loss as long as possible.
+                    score = (-self._tb.probe_wdl(board), self._tb.probe_dtz(board))
+                finally:
+                    board.pop()
+                if best_score is None or score > best_score:
+                    best_move, best_score = move, score
+        except KeyError as e:
+            # Missing table for one of the resulting material signatures
+            logger.debug("Tablebase probe failed: %s", e)
+            return None
+        return best_move
+
+    def log_summary(self):
+        if not self.enabled or not self.lookups:
+            return
+        avg_ms = self.probe_seconds / self.probes * 1000 if self.probes else 0.0
+        logger.info(f"Tablebase: {self.hits}/{self.lookups} lookups solved "
+                    f"({self.hits / self.lookups:.0%}), {self.cache_hits} from cache, "
+                    f"avg probe {avg_ms:.2f} ms")
+
+    def close(self):
+        if self._tb is not None:
+            self._tb.close()
+            self._tb = None
@@ -0,0 +1,97 @@
+"""
+Clock-aware time management.
+
+Lichess sends wtime/btime/winc/binc with every gameState (and inside
+gameFull.state). ClockState keeps the latest values for a game and
+TimeManager turns them into a chess.engine.Limit: the engine gets both
+clocks and an explicit per-move budget, reduced by a configurable move
+overhead for network and host latency, and still capped by the configured
+search depth.
+"""
+
+import time
+import logging
+from datetime import datetime, timedelta
+import chess
+import chess.engine
+
+logger = logging.getLogger(__name__)
+
+MIN_MOVE_TIME = 0.05  # Seconds; never ask the engine for less than this
+MAX_MOVE_TIME = 10.0  # Seconds; upper bound for slow or unlimited games
+MOVES_TO_GO = 30  # Assumed remaining moves when spreading the clock
+INCREMENT_SHARE = 0.8  # Fraction of the increment spent on the current move
+
+
+def _seconds(value) -> float | None:
+    """Convert a clock field to seconds. berserk converts some fields to timedelta, raw JSON has milliseconds."""
+    if value is None:
+        return None
+    if isinstance(value, timedelta):
+        return value.total_seconds()
+    if isinstance(value, datetime):
+        return value.timestamp()
+    return float(value) / 1000
+
+
+class ClockState:
+    def __init__(self):
+        self.wtime: float | None = None
+        self.btime: float | None = None
+        self.winc = 0.0
+        self.binc = 0.0
+        # Monotonic time the clocks were received, to discount our own processing time
+        self.received_at = 0.0
+
+    @property
+    def known(self) -> bool:
+        return self.wtime is not None and self.btime is not None
+
+    def update(self, state: dict):
+        """Update from a gameState event or the state object of a gameFull event."""
+        if 'wtime' not in state and 'btime' not in state:
+            return
+        self.wtime = _seconds(state.get('wtime'))
+        self.btime = _seconds(state.get('btime'))
+        self.winc = _seconds(state.get('winc')) or 0.0
+        self.binc = _seconds(state.get('binc')) or 0.0
+        self.received_at = time.monotonic()
+
+    def remaining(self, color: chess.Color, running: bool = True) -> float:
+        """Time left for color; if its clock is running, minus what elapsed since the clocks arrived."""
+        remaining = self.wtime if color == chess.WHITE else self.btime
+        if running:
+            remaining -= time.monotonic() - self.received_at
+        return max(0.0, remaining)
+
+
+class TimeManager:
+    def __init__(self, move_overhead: float, depth: int | None = None,
+                 min_move_time: float = MIN_MOVE_TIME, max_move_time: float = MAX_MOVE_TIME):
+        self.move_overhead = move_overhead
+        self.depth = depth
+        self.min_move_time = min_move_time
+        self.max_move_time = max_move_time
+
+    def budget(self, clock: ClockState, color: chess.Color) -> float:
+        """Seconds to spend on the current move for the side `color`."""
+        remaining = clock.remaining(color)
+        increment = clock.winc if color == chess.WHITE else clock.binc
+        usable = max(0.0, remaining - self.move_overhead)
+        budget = usable / MOVES_TO_GO + increment * INCREMENT_SHARE
+        # Never plan to use more than a fraction of what is left, whatever the increment
+        budget = min(budget, usable / 4, self.max_move_time)
+        return max(self.min_move_time, budget)
+
+    def limit(self, clock: ClockState, color: chess.Color) -> chess.engine.Limit:
+        """Engine limit for the side to move, falling back to a depth-only search without clocks."""
+        if not clock.known:
+            return chess.engine.Limit(depth=self.depth)
+        return chess.engine.Limit(
+            white_clock=max(0.0, clock.remaining(chess.WHITE, color == chess.WHITE) - self.move_overhead),
+            black_clock=max(0.0, clock.remaining(chess.BLACK, color == chess.BLACK) - self.move_overhead),
+            white_inc=clock.winc,
+            black_inc=clock.binc,
+            time=self.budget(clock, color),
+            depth=self.depth
+        )
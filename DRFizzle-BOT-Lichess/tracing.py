@@ -0,0 +1,143 @@
+"""
+Per-move latency spans, from the game stream line arriving to the move POST returning.
+
+Each move gets a MoveTrace of monotonic timestamps: line received, JSON
+decoded, board synced, engine start and end, POST start and end. The
+durations between them are logged as one compact record per move and kept
+per game and for the whole shift, so a loss on time can be pinned on
+decoding, board sync, the search or the network. The end of every game and
+the shutdown summary log p50/p95/p99 per stage.
+"""
+
+import json
+import time
+import threading
+import logging
+from collections import deque
+from typing import Iterable, Iterator
+
+logger = logging.getLogger(__name__)
+
+# decode: line received -> JSON decoded; sync: decoded -> board synced;
+# select: book, tablebase and bookkeeping outside the search; search: engine start -> end;
+# post: move POST round trip; total: line received -> POST returned
+STAGES = ('decode', 'sync', 'select', 'search', 'post', 'total')
+PERCENTILES = (50, 95, 99)
+SHIFT_SAMPLES = 100_000  # Most recent moves kept per stage for the shift summary
+
+
+class LineStamps:
+    """Arrival and decode time of the last event a stream yielded."""
+
+    def __init__(self):
+        now = time.monotonic()
+        self.received = now
+        self.decoded = now
+
+
+def decode_lines(lines: Iterable[bytes | str], stamps: LineStamps) -> Iterator[dict]:
+    """Like roster.parse_lines, recording on stamps when each line arrived and was decoded."""
+    for line in lines:
+        if line and line.strip():
+            stamps.received = time.monotonic()
+            event = json.loads(line)
+            stamps.decoded = time.monotonic()
+            yield event
+
+
+class MoveTrace:
+    __slots__ = ('received', 'decoded', 'synced', 'engine_start', 'engine_end', 'post_start', 'post_end')
+
+    def __init__(self, received: float, decoded: float):
+        self.received = received
+        self.decoded = decoded
+        self.synced = decoded
+        self.engine_start: float | None = None
+        self.engine_end: float | None = None
+        self.post_start: float | None = None
+        self.post_end: float | None = None
+
+    def spans(self) -> dict[str, float]:
+        """Seconds per stage; only meaningful once the POST has returned."""
+        search = self.engine_end - self.engine_start if self.engine_start is not None else 0.0
+        return {
+            'decode': self.decoded - self.received,
+            'sync': self.synced - self.decoded,
+            'select': self.post_start - self.synced - search,
+            'search': search,
+            'post': self.post_end - self.post_start,
+            'total': self.post_end - self.received,
+        }
+
+
+class _Spans:
+    """Renders the spans only when the log record is formatted (on the log writer thread in queue mode)."""
+
+    __slots__ = ('spans',)
+
+    def __init__(self, spans: dict[str, float]):
+        self.spans = spans
+
+    def __str__(self) -> str:
+        return " ".join(f"{stage} {seconds * 1000:.1f}" for stage, seconds in self.spans.items())
+
+
+class _Percentiles:
+    """Like _Spans: sorts the samples only when the log record is formatted."""
+
+    __slots__ = ('samples',)
+
+    def __init__(self, samples: dict[str, Iterable[float]]):
+        self.samples = samples
+
+    def __str__(self) -> str:
+        return format_percentiles(self.samples)
+
+
+def percentile(ordered: list[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    index = max(0, min(len(ordered) - 1, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def format_percentiles(samples: dict[str, Iterable[float]]) -> str:
+    parts = []
+    for stage in STAGES:
+        ordered = sorted(samples.get(stage, ()))
+        if ordered:
+            values = "/".join(f"{percentile(ordered, pct) * 1000:.1f}" for pct in PERCENTILES)
+            parts.append(f"{stage} {values}")
+    return ", ".join(parts)
+
+
+class LatencyTracker:
+    """Move spans per running game and for the whole shift."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._games: dict[str, dict[str, list[float]]] = {}
+        self.shift = {stage: deque(maxlen=SHIFT_SAMPLES) for stage in STAGES}
+        self.moves = 0
+
+    def record(self, game_id: str, ply: int, source: str, trace: MoveTrace):
+        spans = trace.spans()
+        with self._lock:
+            game = self._games.setdefault(game_id, {stage: [] for stage in STAGES})
+            for stage, seconds in spans.items():
+                game[stage].append(seconds)
+                self.shift[stage].append(seconds)
+            self.moves += 1
+        logger.info("Move trace %s ply %d (%s): %s ms", game_id, ply, source, _Spans(spans))
+
+    def end_game(self, game_id: str):
+        with self._lock:
+            game = self._games.pop(game_id, None)
+        if game and game['total']:
+            logger.info("Game %s move latency p50/p95/p99 ms over %d move(s): %s",
+                        game_id, len(game['total']), _Percentiles(game))
+
+    def log_summary(self):
+        with self._lock:
+            shift = {stage: list(samples) for stage, samples in self.shift.items()}
+        if shift['total']:
+            logger.info(f"Move latency p50/p95/p99 ms over {self.moves} move(s): {format_percentiles(shift)}")
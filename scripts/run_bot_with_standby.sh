@@ -6,6 +6,7 @@ set -euo pipefail
 # - Default shift length: 180 minutes (3 hours)
 # - Sends SIGUSR1 as a "standby" notification 5 minutes before the end of the shift
 # - After 5 minutes, sends SIGTERM to request graceful shutdown, then SIGKILL if needed
+# - Exits with the bot's own exit status, whenever the bot stopped
 
 SHIFT_MINUTES=${SHIFT_MINUTES:-180}
 STANDBY_MINUTES=${STANDBY_MINUTES:-5}
@@ -27,6 +28,21 @@ if [ -z "${LICHESS_API_TOKEN-}" ]; then
   fi
 fi
 
+# The bot exits with 0 after a clean drain, or 64+N when N games were resigned at the drain deadline.
+# Reaps the bot and leaves its exit status in BOT_STATUS for the runner to exit with.
+BOT_STATUS=0
+report_exit() {
+  BOT_STATUS=0
+  wait "${BOT_PID}" || BOT_STATUS=$?
+  if [ "${BOT_STATUS}" -eq 0 ]; then
+    echo "Bot exited gracefully; every game was played to the end."
+  elif [ "${BOT_STATUS}" -ge 64 ] && [ "${BOT_STATUS}" -lt 128 ]; then
+    echo "Bot exited after draining; $(( BOT_STATUS - 64 )) game(s) resigned at the deadline."
+  else
+    echo "Bot exited with status ${BOT_STATUS}." >&2
+  fi
+}
+
 # Start the bot in background
 python DRFizzle-BOT-Lichess/lichess_bot.py &
 BOT_PID=$!
@@ -40,7 +56,8 @@ if kill -0 "${BOT_PID}" 2>/dev/null; then
   kill -USR1 "${BOT_PID}" || true
 else
   echo "Bot process ${BOT_PID} exited before standby time." >&2
-  exit 0
+  report_exit
+  exit "${BOT_STATUS}"
 fi
 
 echo "Standby signal sent. Waiting ${FINAL_WAIT_SECONDS} seconds before shutdown..."
@@ -52,15 +69,18 @@ if kill -0 "${BOT_PID}" 2>/dev/null; then
   # wait up to 30 seconds for process to exit
   for i in {1..30}; do
     if ! kill -0 "${BOT_PID}" 2>/dev/null; then
-      echo "Bot exited gracefully."
-      exit 0
+      report_exit
+      exit "${BOT_STATUS}"
     fi
     sleep 1
   done
   echo "Bot did not exit; sending SIGKILL"
   kill -KILL "${BOT_PID}" || true
+  report_exit
 else
   echo "Bot process ${BOT_PID} already exited." >&2
+  report_exit
 fi
 
 echo "Runner finished."
+exit "${BOT_STATUS}"